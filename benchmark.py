@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from datapipeline.benchmark_runner import BenchmarkRunner
+
+
+def main() -> None:
+
+    temp_directory: Path = Path(".benchmark")
+    scales: list[int] = [1_000_000, 10_000_000, 60_000_000]  # rows of title.principals, the other files alike
+    seed: int = 42  # the same seed and scale generate the same files, they are kept between runs
+    compressed: bool = False  # .tsv.gz sources like the ones FilesDownloader keeps
+    tables: bool = True  # every table on its own, before the full TablesProcessor run
+
+    settings: dict = {
+        "row_limit_size": 0,
+        "batch_size": 1_000_000,
+        "debug": False,
+        "max_workers": 1,
+        "memory_budget": 0,
+        "batch_workers": 1,
+        "sort_memory_limit": 0,
+        "integer_ids": False,
+        "partitioned_output": False,
+        "profile": False,  # stage reports of every case in <scale directory>/profile
+    }
+
+    try:
+
+        # generate synthetic sources, process them and compare with the previous results in .benchmark/results.jsonl
+        BenchmarkRunner.run(temp_directory, scales, settings, tables, seed, compressed)
+
+    except BenchmarkRunner.BenchmarkError as e:
+        print(f"Error(s) occurred: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,58 @@
-import hashlib
+import json
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from collections.abc import Callable
-from typing import Any, ClassVar
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, Any, ClassVar
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .delta_state import DeltaState
+from .external_sorter import ExternalSorter
+from .id_hasher import IdHasher
+from .imdb_ids import ImdbIds
+from .parquet_profile import ParquetProfile
+from .parquet_stream_writer import ParquetStreamWriter
+from .source_cache import SourceCache
+from .source_reader import SourceReader
+from .stage_profiler import StageProfiler
+from .title_index import TitleIndex
+
+if TYPE_CHECKING:
+    from .dimension_table import DimensionTable
 
 
 class AbstractTable(ABC):
     temp_directory: Path
     row_limit_size: int
     batch_size: int
-    debug: bool
+    debug: bool = False
+    batch_workers: int = 1
+    sort_memory_limit: int = 0
+    integer_ids: bool = False
+    incremental: bool = False
+    merge_deltas: bool = True
+    partitioned_output: bool = False
     created_parquet_files: ClassVar[list[str]] = []
+    source_columns: ClassVar[dict[str, list[str]]] = {}
+    batch_columns: ClassVar[list[str]] = []
+    title_index: ClassVar[str | None] = None
+    # output column of the tconst or nconst a row belongs to, tables without one are rebuilt by every run
+    delta_key: ClassVar[str | None] = None
+    output_order: ClassVar[str | None] = None
+    changed_keys: ClassVar[pd.Series | None] = None
+    parquet_profile: ClassVar[ParquetProfile] = ParquetProfile()
+    # dimension tables built from the distinct values of the rows this table reads, instead of a scan of their own
+    dimensions: ClassVar[list[type["DimensionTable"]]] = []
+    dimension_values: ClassVar[dict[str, list[pd.Series]]] = {}
+    id_cache: ClassVar[OrderedDict[str, str]] = OrderedDict()
+    id_cache_size: ClassVar[int] = 100_000
+    string_dtype: ClassVar[pd.StringDtype] = pd.StringDtype("pyarrow")
 
     class FileProcessingError(Exception):
         pass
@@ -26,85 +66,405 @@ class AbstractTable(ABC):
         pass
 
     @classmethod
-    def _generate_id(cls, column: str) -> str | None:
-        if pd.isna(column):
-            return column
-        return hashlib.md5(column.encode("utf-8")).hexdigest()
+    def process(cls, file_name: str, second_file_name: str | None) -> None:
+
+        # in incremental mode only the titles or persons changed since the previous run are processed again
+        cls.changed_keys = cls._changed_keys(file_name)
+        if cls.changed_keys is not None:
+            for delta_path in [*Path(cls.temp_directory).glob(f"{cls.__name__}.delta*.parquet"),
+                               Path(cls.temp_directory, f"{cls.__name__}.tombstones.parquet")]:
+                delta_path.unlink(missing_ok=True)
+
+        # a delta does not read all the rows, its dimension tables are scanned on their own, as are the ones built from
+        # the debug slice of their source when this table only reads its first batch
+        cls.dimension_values = {dimension.__name__: [] for dimension in cls.dimensions
+                                if cls.changed_keys is None
+                                and not (cls.debug and cls.batch_columns and dimension.debug_slice)}
+        with StageProfiler.stage(cls.__name__, "process"):
+            cls.process_table(file_name, second_file_name)
+            if cls.changed_keys is not None:
+                cls._finish_delta()
+        cls._process_dimensions()
 
     @classmethod
-    def _generate_synthetic_id(cls, row: dict[str, Any]) -> str:
-        combined_values = row["tconst"] + str(row["ordering"]) + row["nconst"]
-        return hashlib.md5(combined_values.encode("utf-8")).hexdigest()
+    def _collect_dimensions(cls, file_name: str, df: pd.DataFrame) -> None:
+        for dimension in cls.dimensions:
+            if dimension.__name__ in cls.dimension_values and dimension.dimension_source == file_name:
+                cls.dimension_values[dimension.__name__].append(dimension.distinct_values(df))
 
     @classmethod
-    def _read_tsv_into_dataframe(cls, file_name: str) -> pd.DataFrame:
-        print(f"Reading {file_name} into dataframe...")
-        return pd.read_csv(Path(cls.temp_directory, file_name),
-                           sep="\t", low_memory=False,
-                           usecols=["tconst"],
-                           )
+    def _process_dimensions(cls) -> None:
+        for dimension in cls.dimensions:
+            if dimension.__name__ not in cls.dimension_values:
+                dimension.process(dimension.dimension_source, None)
+                continue
+            print(f"Building table {dimension.__name__} from the rows of table {cls.__name__}", flush=True)
+            with StageProfiler.stage(dimension.__name__, "process"):
+                dimension.save(cls.dimension_values.pop(dimension.__name__))
 
     @classmethod
-    def _replace_chars(cls, text: str) -> str:
-        if isinstance(text, str):
-            return text.replace("[\"", "").replace("\"]", "")
-        return text
+    def source_files(cls, file_name: str) -> list[str]:
+        return sorted({*cls.source_columns, *([file_name] if cls.batch_columns else []),
+                       *([cls.title_index] if cls.title_index is not None else [])})
 
     @classmethod
-    def _process_batches(
-            cls,
-            file_name: str,
-            second_file_name: str | None,
-            _process_batch: Callable,
-    ) -> None:
+    def output_paths(cls) -> list[Path]:
+        return sorted(Path(cls.temp_directory).glob(f"{cls.__name__}.parquet"))
 
-        df = pd.read_csv(Path(cls.temp_directory, file_name), sep="\t", usecols=[0])
-        total_rows = df.shape[0]
-        del df
-        num_batches = total_rows // cls.batch_size  # type: ignore
+    @classmethod
+    def _changed_keys(cls, file_name: str) -> pd.Series | None:
 
-        df2 = cls._read_tsv_into_dataframe(second_file_name) if second_file_name is not None else None
+        if not cls.incremental or cls.debug or cls.delta_key is None or not cls.output_paths():
+            return None
+        try:
+            return DeltaState.changed_keys(cls.temp_directory, cls.source_files(file_name))
+        except DeltaState.DeltaStateError as e:
+            raise cls.FileProcessingError(str(e)) from None
 
-        if cls.debug:
-            num_batches = 1
+    @classmethod
+    def _filter_changed(cls, file_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        if cls.changed_keys is None or file_name not in DeltaState.key_columns:
+            return df
+        return df[df[DeltaState.key_columns[file_name]].isin(cls.changed_keys)]
 
-        file_suffix = 0
+    @classmethod
+    def _is_partitioned(cls) -> bool:
+        return cls.partitioned_output and bool(cls.parquet_profile.partition_columns)
 
-        for i in range(num_batches):
-            file_suffix += 1
-            skip_rows = i * cls.batch_size
-            file_suffix += 1
-            _process_batch(
-                file_name,
-                str(file_suffix).zfill(2),
-                cls.batch_size,
-                skip_rows,
-                df2 if df2 is not None else None,
-            )
+    @classmethod
+    def _output_path(cls) -> Path:
+        name = cls.__name__ if cls.changed_keys is None else f"{cls.__name__}.delta"
+        return Path(cls.temp_directory, f"{name}.parquet")
 
-        remaining_rows = total_rows % cls.batch_size
-        if remaining_rows > 0:
-            skip_rows = num_batches * cls.batch_size
-            _process_batch(
-                file_name,
-                str(file_suffix).zfill(2),
-                remaining_rows,
-                skip_rows,
-                df2 if df2 is not None else None,
-            )
+    @classmethod
+    def _merge_delta(cls, tombstones: pa.Array) -> None:
+
+        # rows of changed keys are replaced by the rows of the delta
+        output_path, delta_path = Path(cls.temp_directory, f"{cls.__name__}.parquet"), cls._output_path()
+        table = ParquetStreamWriter.read(output_path, cls.parquet_profile.partition_columns)
+        table = table.filter(pc.invert(pc.is_in(table[cls.delta_key], value_set=tombstones)))
+        if delta_path.exists():
+            table = pa.concat_tables([table, pq.read_table(delta_path).cast(table.schema)])
+            if cls.output_order is not None:
+                indices = pc.sort_indices(table, sort_keys=[(cls.output_order, "ascending")], null_placement="at_end")
+                table = table.take(indices)
+        cls._write_tables([table], output_path, cls._is_partitioned())
+        delta_path.unlink(missing_ok=True)
+
+    @classmethod
+    def _finish_delta(cls) -> None:
+
+        # the tombstones list every key whose rows were removed or replaced by the delta
+        tombstones_path = Path(cls.temp_directory, f"{cls.__name__}.tombstones.parquet")
+        try:
+            tombstones = pd.DataFrame({cls.delta_key: cls.changed_keys}).astype({cls.delta_key: cls._id_dtype()})
+            if cls.merge_deltas:
+                print(f"Merging delta of {tombstones.shape[0]:n} keys into table {cls.__name__}", flush=True)
+                cls._merge_delta(pa.array(tombstones[cls.delta_key]))
+                tombstones_path.unlink(missing_ok=True)
+            else:
+                tombstones.to_parquet(tombstones_path, index=False)
+
+        except Exception as e:
+            error_message = f"An error occurred while applying delta of table {cls.__name__}: {e}"
+            raise cls.FileProcessingError(error_message) from None
+
+    @classmethod
+    def _id_dtype(cls) -> pd.Int32Dtype | pd.StringDtype:
+        return pd.Int32Dtype() if cls.integer_ids else cls.string_dtype
+
+    @classmethod
+    def _generate_ids(cls, s: pd.Series) -> pd.Series:
+        return pd.Series(IdHasher.hash_values(s), index=s.index, dtype=object)
+
+    @classmethod
+    def _generate_interned_ids(cls, s: pd.Series) -> pd.Series:
+
+        # hash each distinct value once, reusing ids of values already hashed by any table in this run
+        codes, uniques = pd.factorize(s)
+        uniques = np.asarray(uniques, dtype=object)
+        unique_ids = np.empty(len(uniques), dtype=object)
+        missing = []
+        for position, value in enumerate(uniques):
+            if value in cls.id_cache:
+                cls.id_cache.move_to_end(value)
+                unique_ids[position] = cls.id_cache[value]
+            else:
+                missing.append(position)
+
+        if missing:
+            unique_ids[missing] = cls._generate_ids(pd.Series(uniques[missing], dtype=object)).to_numpy()
+            cls.id_cache.update(zip(uniques[missing], unique_ids[missing], strict=True))
+            while len(cls.id_cache) > cls.id_cache_size:
+                cls.id_cache.popitem(last=False)
+
+        # categorical values keep their codes, only the categories are replaced by the ids
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return pd.Series(pd.Categorical.from_codes(codes, categories=unique_ids), index=s.index)
+
+        values = s.to_numpy(dtype=object, copy=True)
+        valid = codes >= 0
+        values[valid] = unique_ids[codes[valid]]
+        return pd.Series(values, index=s.index, dtype=object)
+
+    @classmethod
+    def _generate_synthetic_ids(cls, df: pd.DataFrame) -> pd.Series:
+        # synthetic ids are hashed from the string form of the ids, also when they are parsed as integers
+        if pd.api.types.is_integer_dtype(df["tconst"].dtype):
+            df = df.assign(tconst=ImdbIds.decode(df["tconst"], "tt"), nconst=ImdbIds.decode(df["nconst"], "nm"))
+        return pd.Series(IdHasher.hash_columns(df, ["tconst", "ordering", "nconst"]), index=df.index, dtype=object)
+
+    @classmethod
+    def _read_source(cls, file_name: str, columns: list[str], limit_rows: bool = True) -> pd.DataFrame:
+        nrows = cls.row_limit_size if cls.debug and limit_rows else None
+        with StageProfiler.stage(cls.__name__, "read") as stage:
+            df = cls._filter_changed(file_name, SourceCache.read(cls.temp_directory, file_name, columns, nrows))
+            stage.rows_out = df.shape[0]
+        cls._collect_dimensions(file_name, df)
+        return df
+
+    @classmethod
+    def _in_title_index(cls, s: pd.Series) -> np.ndarray:
+
+        # semi-join on the tconst index instead of an inner join with the tconst column of title.basics.tsv
+        try:
+            return TitleIndex.contains(cls.temp_directory, cls.title_index, s)  # type: ignore
+        except TitleIndex.TitleIndexError as e:
+            raise cls.FileProcessingError(str(e)) from None
+
+    @staticmethod
+    def _decode_json_list(text: str) -> list[str]:
+        try:
+            values = json.loads(text)
+        except ValueError:
+            return [text]
+        if not isinstance(values, list):
+            return [str(values)]
+        return [value if isinstance(value, str) else json.dumps(value) for value in values if value is not None]
+
+    @classmethod
+    def _parse_json_lists(cls, s: pd.Series) -> pa.ListArray:
+
+        # without escapes every quote of an array of strings is a delimiter, so plain ["a","b"] arrays are split by
+        # the string kernels; arrays with escapes or with spaces around the delimiters are decoded as JSON row by row
+        array = pa.array(s, type=pa.large_string(), from_pandas=True)
+        lists = pc.split_pattern(pc.utf8_slice_codeunits(array, 2, -2), "\",\"")
+        plain = pc.and_(pc.starts_with(array, "[\""), pc.ends_with(array, "\"]"))
+        for pattern in ["\\", "\" ", " \""]:
+            plain = pc.and_not(plain, pc.match_substring(array, pattern))
+        fallback = pc.invert(pc.fill_null(plain, True))
+        if not pc.any(fallback).as_py():
+            return lists
+
+        texts = array.filter(fallback).to_numpy(zero_copy_only=False)
+        decoded = pa.array([cls._decode_json_list(text) for text in texts], lists.type)
+        fallback = fallback.to_numpy(zero_copy_only=False)
+        positions = np.arange(len(lists))
+        positions[fallback] = len(lists) + np.arange(len(decoded))
+        return pa.concat_arrays([lists, decoded]).take(positions)
+
+    @classmethod
+    def _split_values(cls, s: pd.Series, separator: str = ",") -> tuple[pa.ListArray, np.ndarray | None]:
 
-        del df2
+        # categorical columns are split once per category present, the rows refer to the split categories by code
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            return pc.split_pattern(pa.array(s, type=pa.large_string(), from_pandas=True), separator), None
+        codes = s.cat.codes.to_numpy()
+        present = np.zeros(len(s.cat.categories), dtype=bool)
+        present[codes[codes >= 0]] = True
+        categories = pa.array(s.cat.categories.to_numpy(dtype=object)[present], type=pa.large_string())
+        codes = np.where(codes >= 0, np.cumsum(present)[codes] - 1, -1)
+        return pc.split_pattern(categories, separator), codes
 
     @classmethod
-    def _save_to_parquet(cls, df: pd.DataFrame, file_suffix: str | None = None) -> None:
+    def _unnest(cls, df: pd.DataFrame, value_column: str, lists: pa.ListArray,  # noqa: PLR0913
+                codes: np.ndarray | None = None, key_column: str | None = None) -> pd.DataFrame:
 
+        # split, explode, dropna and drop_duplicates in one pass over the list offsets: the rows take the positions
+        # of their values, (key, value) pairs are deduplicated as integer codes and the values leave as categorical;
+        # codes select the list of every row, one list per row without them
+        lengths = pc.fill_null(pc.list_value_length(lists), 0).to_numpy().astype(np.int64)
+        starts = np.cumsum(lengths) - lengths
+        if codes is not None:
+            valid = codes >= 0
+            lengths, starts = np.where(valid, lengths[codes], 0), np.where(valid, starts[codes], 0)
+        parents = np.repeat(np.arange(len(lengths)), lengths)
+        positions = np.arange(len(parents)) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+        encoded = pc.dictionary_encode(pc.list_flatten(lists))
+        values = encoded.indices.to_numpy()[positions].astype(np.int64)
+        if key_column is None:
+            keep = np.sort(np.unique(values, return_index=True)[1])
+        else:
+            keys = pd.factorize(df[key_column])[0][parents].astype(np.int64)
+            keep = np.flatnonzero(~pd.Series(keys * len(encoded.dictionary) + values).duplicated().to_numpy())
+
+        categories = encoded.dictionary.to_numpy(zero_copy_only=False)
+        unnested = pd.DataFrame({value_column: pd.Categorical.from_codes(values[keep], categories=categories)})
+        if key_column is not None:
+            unnested.insert(0, key_column, df[key_column].iloc[parents[keep]].reset_index(drop=True))
+        return unnested
+
+    @classmethod
+    def _read_batches(cls, file_name: str, columns: list[str]) -> Iterator[pd.DataFrame]:
+
+        # one pass over one open file handle, every batch continues where the previous one stopped
+        try:
+            batches = SourceReader.read_batches(cls.temp_directory, file_name, columns, cls.batch_size)
+            for df in StageProfiler.iterate(cls.__name__, "read", batches):
+                df = cls._filter_changed(file_name, df)  # noqa: PLW2901
+                if cls.changed_keys is None or df.shape[0]:
+                    yield df
+
+        except SourceReader.SourceReaderError as e:
+            raise cls.FileProcessingError(str(e)) from None
+
+    @classmethod
+    def _iter_source(cls, file_name: str, columns: list[str]) -> Iterator[pd.DataFrame]:
+
+        # a source streamed batch by batch past the source cache, limited the same way as _read_source
+        remaining = cls.row_limit_size if cls.debug else None
+        for df in cls._read_batches(file_name, columns):
+            if remaining is not None:
+                df = df.head(remaining)  # noqa: PLW2901
+                remaining -= df.shape[0]
+            yield df
+            if remaining == 0:
+                break
+
+    @classmethod
+    def _numbered_batches(cls, file_name: str) -> Iterator[pd.DataFrame]:
+
+        total_rows = 0
+        for batch_number, df in enumerate(cls._read_batches(file_name, cls.batch_columns), start=1):
+            print(f"Processing: {file_name}_{batch_number:02}, {df.shape[0]:n}:{total_rows:n}")
+            total_rows += df.shape[0]
+            cls._collect_dimensions(file_name, df)
+            yield df
+
+            if cls.debug:
+                break
+
+        print(f"Read {total_rows:n} rows of {file_name}")
+
+    @staticmethod
+    def _set_worker_variables(variables: dict[str, Any], profile_directory: Path | None) -> None:
+        for name, value in variables.items():
+            setattr(AbstractTable, name, value)
+        StageProfiler.configure(profile_directory)
+
+    @classmethod
+    def _transform_batch(cls, _process_batch: Callable, file_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        with StageProfiler.stage(cls.__name__, "transform", df.shape[0]) as stage:
+            df = _process_batch(file_name, df)
+            stage.rows_out = len(df)
+        return df
+
+    @classmethod
+    def _process_batches_in_parallel(cls, file_name: str, _process_batch: Callable) -> Iterator[pd.DataFrame]:
+
+        # the tconst index is built before the workers start, every worker memory-maps the same file
+        if cls.title_index is not None:
+            TitleIndex.build(cls.temp_directory, cls.title_index)
+        variables = {name: getattr(AbstractTable, name) for name in ("temp_directory", "row_limit_size", "batch_size",
+                                                                      "debug", "integer_ids")}
+
+        with ProcessPoolExecutor(max_workers=cls.batch_workers, initializer=cls._set_worker_variables,
+                                 initargs=(variables, StageProfiler.directory)) as executor:
+            running: deque[Future] = deque()
+            for df in cls._numbered_batches(file_name):
+                running.append(executor.submit(cls._transform_batch, _process_batch, file_name, df))
+
+                # keep the reader at most one round of batches ahead of the workers, results come back in batch order
+                if len(running) >= 2 * cls.batch_workers:
+                    yield running.popleft().result()
+
+            while running:
+                yield running.popleft().result()
+
+    @classmethod
+    def _process_batches(cls, file_name: str, _process_batch: Callable) -> Iterator[pd.DataFrame]:
+
+        if cls.batch_workers > 1:
+            yield from cls._process_batches_in_parallel(file_name, _process_batch)
+        else:
+            for df in cls._numbered_batches(file_name):
+                yield cls._transform_batch(_process_batch, file_name, df)
+
+    @classmethod
+    def _save_to_parquet(cls, df: pd.DataFrame) -> None:
+        cls._save_batches_to_parquet([df])
+
+    @classmethod
+    def _write_tables(cls, tables: Iterable[pa.Table], file_path: Path, partitioned: bool) -> int:
+
+        # every batch is appended to one open file, or to the hive partitions of the partitioned layout; the dataset
+        # writer pulls the batches itself, the stages producing them are not part of its save stage
+        if partitioned:
+            with StageProfiler.stage(cls.__name__, "save") as stage:
+                stage.rows_out = ParquetStreamWriter.write_partitioned(file_path, tables, cls.parquet_profile)
+            return stage.rows_out
+        with ParquetStreamWriter(file_path, cls.parquet_profile) as writer:
+            for table in tables:
+                with StageProfiler.stage(cls.__name__, "save") as stage:
+                    writer.write(table)
+                    stage.rows_out = table.num_rows
+            with StageProfiler.stage(cls.__name__, "save"):
+                writer.close()
+        return writer.rows
+
+    @classmethod
+    def _to_tables(cls, batches: Iterable[pd.DataFrame]) -> Iterator[pa.Table]:
+        for df in batches:
+            with StageProfiler.stage(cls.__name__, "save", df.shape[0]):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            yield table
+
+    @classmethod
+    def _save_batches_to_parquet(cls, batches: Iterable[pd.DataFrame]) -> None:
+        cls._save_tables_to_parquet(cls._to_tables(batches))
+
+    @classmethod
+    def _save_tables_to_parquet(cls, tables: Iterable[pa.Table]) -> None:
+
+        # deltas are always written as single files
         try:
-            file_name = f"{cls.__name__}.parquet" if file_suffix is None else f"{cls.__name__}_{file_suffix}.parquet"
-            file_path = Path(cls.temp_directory, file_name)
+            file_path = cls._output_path()
             print(f"Saving DataFrame to Parquet: {file_path}")
-            df.to_parquet(file_path, index=False)
-            print("DataFrame saved successfully.")
+            rows = cls._write_tables(tables, file_path, cls._is_partitioned() and cls.changed_keys is None)
+            print(f"DataFrame saved successfully, {rows:n} rows.")
+
+        except (cls.FileProcessingError, cls.DataTransformationError):
+            raise
 
         except Exception as e:
             error_message = f"An error occurred while saving DataFrame to Parquet: {e}"
             raise cls.FileProcessingError(error_message) from None
+
+    @classmethod
+    def _sort_deduplicate_and_save(cls, frames: Iterable[pd.DataFrame], key_columns: list[str]) -> None:
+
+        if cls.output_order is None:
+            error_message = f"Table {cls.__name__} has no output order to sort by"
+            raise cls.DataTransformationError(error_message)
+        sort_column = cls.output_order
+
+        # with a memory limit the frames are sorted out of core into sorted runs, which are merged into the Parquet file
+        if cls.sort_memory_limit:
+            directory = Path(cls.temp_directory, f"{cls.__name__}.sort")
+            sorted_frames = ExternalSorter.sort(frames, directory, sort_column, key_columns, cls.sort_memory_limit)
+            cls._save_batches_to_parquet(StageProfiler.iterate(cls.__name__, "sort", sorted_frames))
+            return
+
+        frames = list(frames)
+        with StageProfiler.stage(cls.__name__, "sort", sum(frame.shape[0] for frame in frames)) as stage:
+            df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            del frames
+            df = (
+                df
+                .sort_values(by=[sort_column], kind="stable")
+                .drop_duplicates(subset=key_columns)
+                .reset_index(drop=True)
+            )
+            stage.rows_out = df.shape[0]
+        cls._save_to_parquet(df)
@@ -0,0 +1,193 @@
+import json
+import multiprocessing
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+from typing import Any, ClassVar
+
+import pyarrow.dataset as ds
+
+from .synthetic_sources import SyntheticSources
+from .tables_processor import TablesProcessor
+
+resource: ModuleType | None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass
+class BenchmarkResult:
+    started: str
+    revision: str
+    scale: int
+    case: str
+    settings: dict[str, Any]
+    source_rows: int
+    output_rows: int
+    output_bytes: int
+    wall_time: float
+    cpu_time: float
+    rows_per_second: float
+    # the largest resident set size of the case process and of the processes it started
+    peak_rss: int
+
+
+class BenchmarkRunner:
+    results_name: ClassVar[str] = "results.jsonl"
+    # the case running all tables through the processor, the other cases are named after their table
+    full_case: ClassVar[str] = "TablesProcessor"
+
+    class BenchmarkError(Exception):
+        pass
+
+    @staticmethod
+    def _revision() -> str:
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"],  # noqa: S603, S607
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return "unknown"
+
+    @staticmethod
+    def _usage() -> tuple[float, int]:
+        if resource is None:
+            return time.process_time(), 0
+        usages = [resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)]
+        cpu_time = sum(usage.ru_utime + usage.ru_stime for usage in usages)
+        return cpu_time, max(usage.ru_maxrss for usage in usages) * 1024
+
+    @classmethod
+    def _run_case(cls, directory: Path, case: str, settings: dict[str, Any]) -> tuple[float, float, int]:
+
+        # runs in a fresh process, so that the memory of the case is not mixed with the one of earlier cases
+        if case != cls.full_case:
+            TablesProcessor.tables = [entry for entry in TablesProcessor.tables if entry[0].__name__ == case]
+        start_cpu_time, _ = cls._usage()
+        start_time = time.perf_counter()
+        TablesProcessor.process_tables(directory, **settings)
+        wall_time = time.perf_counter() - start_time
+        cpu_time, peak_rss = cls._usage()
+        return wall_time, cpu_time - start_cpu_time, peak_rss
+
+    @staticmethod
+    def _outputs(directory: Path) -> list[Path]:
+        return [path for table, _, _ in TablesProcessor.tables
+                for path in Path(directory).glob(f"{table.__name__}.parquet")]
+
+    @classmethod
+    def _clear_outputs(cls, directory: Path) -> None:
+        for path in cls._outputs(directory):
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+
+    @classmethod
+    def _source_rows(cls, case: str, files: dict[str, int]) -> int:
+        if case == cls.full_case:
+            return sum(files.values())
+        table, file_name, _ = next(entry for entry in TablesProcessor.tables if entry[0].__name__ == case)
+        return sum(files[source] for source in table.source_files(file_name))
+
+    @classmethod
+    def _run(  # noqa: PLR0913
+            cls,
+            directory: Path,
+            scale: int,
+            case: str,
+            settings: dict[str, Any],
+            files: dict[str, int],
+    ) -> BenchmarkResult:
+
+        cls._clear_outputs(directory)
+        started = datetime.now()  # noqa: DTZ005
+        print(f"\nBenchmarking {case} at {scale:,} rows", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            wall_time, cpu_time, peak_rss = executor.submit(cls._run_case, directory, case, settings).result()
+
+        outputs = cls._outputs(directory)
+        source_rows = cls._source_rows(case, files)
+        return BenchmarkResult(
+            started=started.isoformat(timespec="seconds"),
+            revision=cls._revision(),
+            scale=scale,
+            case=case,
+            settings=settings,
+            source_rows=source_rows,
+            output_rows=sum(ds.dataset(path, format="parquet").count_rows() for path in outputs),
+            output_bytes=sum(file_path.stat().st_size for path in outputs
+                             for file_path in ([path] if path.is_file() else path.rglob("*")) if file_path.is_file()),
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            rows_per_second=source_rows / wall_time if wall_time else 0.0,
+            peak_rss=peak_rss,
+        )
+
+    @classmethod
+    def load_results(cls, results_directory: Path) -> list[BenchmarkResult]:
+        results_path = Path(results_directory, cls.results_name)
+        if not results_path.exists():
+            return []
+        return [BenchmarkResult(**json.loads(line)) for line in results_path.read_text().splitlines() if line]
+
+    @staticmethod
+    def _summary(result: BenchmarkResult, previous: BenchmarkResult | None) -> str:
+
+        # against the latest earlier run of the same case, scale and settings
+        summary = (f"{result.case:<22}{result.wall_time:>10.1f} s{result.rows_per_second:>14,.0f} rows/s"
+                   f"{result.peak_rss / 1024 ** 2:>10,.0f} MiB")
+        if previous is not None:
+            summary += (f"  {result.wall_time / previous.wall_time - 1:+7.1%} time, "
+                        f"{result.peak_rss / max(previous.peak_rss, 1) - 1:+7.1%} memory vs {previous.revision} "
+                        f"of {previous.started}")
+        return summary
+
+    @classmethod
+    def run(  # noqa: PLR0913
+            cls,
+            directory: Path,
+            scales: list[int],
+            settings: dict[str, Any],
+            tables: bool = True,
+            seed: int = 42,
+            compressed: bool = False,
+    ) -> list[BenchmarkResult]:
+
+        # every scale has its own synthetic sources, the results of all runs are appended to one file
+        previous_results = cls.load_results(directory)
+        results = []
+        try:
+            for scale in scales:
+                scale_directory = Path(directory, f"synthetic-{scale}")
+                files = SyntheticSources.generate(scale_directory, scale, seed, compressed)
+                cases = [table.__name__ for table, _, _ in TablesProcessor.tables] if tables else []
+                for case in [*cases, cls.full_case]:
+                    result = cls._run(scale_directory, scale, case, settings, files)
+                    with Path(directory, cls.results_name).open("a") as results_file:
+                        results_file.write(json.dumps(asdict(result)) + "\n")
+                    results.append(result)
+                cls._clear_outputs(scale_directory)
+
+        except SyntheticSources.SyntheticSourcesError as e:
+            raise cls.BenchmarkError(str(e)) from None
+
+        except Exception as e:
+            error_message = f"Error during benchmark: {e}"
+            raise cls.BenchmarkError(error_message) from None
+
+        print("\n\033[92mBenchmark results:\033[0m")
+        for scale in scales:
+            print(f"\n{scale:,} rows of title.principals")
+            for result in (result for result in results if result.scale == scale):
+                previous = next((earlier for earlier in reversed(previous_results)
+                                 if (earlier.scale, earlier.case, earlier.settings) ==
+                                 (result.scale, result.case, result.settings)), None)
+                print(cls._summary(result, previous))
+        return results
@@ -0,0 +1,105 @@
+import shutil
+from pathlib import Path
+from typing import ClassVar
+
+import pandas as pd
+
+from .source_reader import SourceReader
+
+
+class DeltaState:
+    directory_name: ClassVar[str] = "delta"
+    batch_size: ClassVar[int] = 1_000_000
+    # every row of a source belongs to one title or person, changes are tracked per title or person
+    key_columns: ClassVar[dict[str, str]] = {
+        "title.basics.tsv": "tconst",
+        "title.ratings.tsv": "tconst",
+        "title.episode.tsv": "tconst",
+        "title.akas.tsv": "titleId",
+        "title.principals.tsv": "tconst",
+        "name.basics.tsv": "nconst",
+    }
+    changes: ClassVar[dict[str, pd.Series]] = {}
+
+    class DeltaStateError(Exception):
+        pass
+
+    @classmethod
+    def _path(cls, temp_directory: Path, file_name: str, suffix: str) -> Path:
+        return Path(temp_directory, cls.directory_name, f"{file_name}.{suffix}.parquet")
+
+    @classmethod
+    def _entity_hashes(cls, temp_directory: Path, file_name: str, columns: list[str]) -> pd.DataFrame:
+
+        # the hash of an entity is the sum of the hashes of its rows, so rows of one entity may span batches
+        key_column = cls.key_columns[file_name]
+        columns = sorted(set(columns) | {key_column})
+        hashes = []
+        for df in SourceReader.read_batches(temp_directory, file_name, columns, cls.batch_size):
+            row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+            hashes.append(row_hashes.groupby(df[key_column].to_numpy(), sort=False).sum())
+        entity_hashes = pd.concat(hashes).groupby(level=0, sort=False).sum() if hashes else pd.Series(dtype="uint64")
+        return pd.DataFrame({"key": entity_hashes.index, "hash": entity_hashes.to_numpy(dtype="uint64")})
+
+    @classmethod
+    def plan(cls, temp_directory: Path, sources: dict[str, list[str]]) -> None:
+
+        # new snapshots are kept aside until the run succeeds, a failed run is planned again against the old ones
+        Path(temp_directory, cls.directory_name).mkdir(parents=True, exist_ok=True)
+        cls.changes.clear()
+        for file_name, columns in sources.items():
+            if file_name not in cls.key_columns:
+                continue
+            print(f"Comparing {file_name} with the previous run...", flush=True)
+            try:
+                snapshot = cls._entity_hashes(temp_directory, file_name, columns)
+                snapshot.to_parquet(cls._path(temp_directory, file_name, "snapshot.partial"), index=False)
+
+                changes_path = cls._path(temp_directory, file_name, "changes")
+                changes_path.unlink(missing_ok=True)
+                snapshot_path = cls._path(temp_directory, file_name, "snapshot")
+                if not snapshot_path.exists():
+                    continue
+                previous = pd.read_parquet(snapshot_path)
+                if previous["key"].dtype != snapshot["key"].dtype:
+                    continue
+
+                # inserted, changed and deleted entities
+                df = pd.merge(previous, snapshot, on="key", how="outer", suffixes=("_previous", ""))  # noqa: PD015
+                changed = df.loc[df["hash_previous"].ne(df["hash"]) | df["hash"].isna() | df["hash_previous"].isna(),
+                                 ["key"]]
+                changed.to_parquet(changes_path, index=False)
+                print(f"{file_name}: {changed.shape[0]:n} of {snapshot.shape[0]:n} entities changed", flush=True)
+
+            except Exception as e:
+                error_message = f"Error during comparing of file: {file_name}, error: {e}"
+                raise cls.DeltaStateError(error_message) from None
+
+    @classmethod
+    def changed_keys(cls, temp_directory: Path, file_names: list[str]) -> pd.Series | None:
+
+        # None when any of the sources has no previous run to compare with
+        keys = []
+        for file_name in file_names:
+            if file_name not in cls.changes:
+                changes_path = cls._path(temp_directory, file_name, "changes")
+                if not changes_path.exists():
+                    return None
+                cls.changes[file_name] = pd.read_parquet(changes_path)["key"]
+            keys.append(cls.changes[file_name])
+        return pd.concat(keys, ignore_index=True).drop_duplicates() if keys else None
+
+    @classmethod
+    def commit(cls, temp_directory: Path) -> None:
+        for partial_path in Path(temp_directory, cls.directory_name).glob("*.snapshot.partial.parquet"):
+            partial_path.replace(partial_path.with_name(partial_path.name.replace(".partial", "")))
+        for changes_path in Path(temp_directory, cls.directory_name).glob("*.changes.parquet"):
+            changes_path.unlink()
+        cls.changes.clear()
+
+    @classmethod
+    def clear(cls, temp_directory: Path) -> None:
+
+        # outputs of a run that was not compared with the snapshots no longer match them
+        shutil.rmtree(Path(temp_directory, cls.directory_name), ignore_errors=True)
+        cls.changes.clear()
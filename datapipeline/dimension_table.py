@@ -0,0 +1,64 @@
+from abc import abstractmethod
+from collections.abc import Iterable
+from typing import ClassVar
+
+import pandas as pd
+
+from .abstract_table import AbstractTable
+from .stage_profiler import StageProfiler
+
+
+class DimensionTable(AbstractTable):
+    # the rows are the distinct values of batch_columns[0] of this source file
+    dimension_source: ClassVar[str]
+    # debug mode reads the first row_limit_size rows of the source, the first batch otherwise
+    debug_slice: ClassVar[bool] = True
+
+    @classmethod
+    @abstractmethod
+    def _dimension_frame(cls, values: pd.Series) -> pd.DataFrame:
+        pass
+
+    @classmethod
+    def distinct_values(cls, df: pd.DataFrame) -> pd.Series:
+
+        # categorical columns only look at the categories present in the frame
+        s = df[cls.batch_columns[0]]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return pd.Series(s.cat.remove_unused_categories().cat.categories, dtype=object)
+        return pd.Series(s.dropna().unique(), dtype=object)
+
+    @classmethod
+    def _distinct_batch(cls, file_name: str, df: pd.DataFrame) -> pd.Series:
+        _ = file_name
+        return cls.distinct_values(df)
+
+    @classmethod
+    def save(cls, values: Iterable[pd.Series]) -> None:
+
+        parts = [s.astype(object) for s in values]
+        with StageProfiler.stage(cls.__name__, "transform", sum(len(s) for s in parts)) as stage:
+            try:
+                s = pd.concat(parts, ignore_index=True) if parts else pd.Series(dtype=object)
+                df = cls._dimension_frame(pd.Series(s.unique(), dtype=object))
+
+            except Exception as e:
+                error_message = f"Error during building of table {cls.__name__}: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
+
+        cls._save_to_parquet(df)
+
+    @classmethod
+    def process_table(cls, file_name: str, second_file_name: str | None) -> None:
+
+        # a scan of its own, when the fact table reading the same column does not run or only reads a delta
+        _ = second_file_name
+
+        print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
+
+        if cls.debug and cls.debug_slice:
+            cls.save([cls.distinct_values(cls._read_source(file_name, cls.batch_columns))])
+        else:
+            cls.save(cls._process_batches(file_name, cls._distinct_batch))
+        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
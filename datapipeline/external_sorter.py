@@ -0,0 +1,285 @@
+import shutil
+from collections.abc import Iterable, Iterator
+from itertools import chain
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class ExternalSorter:
+    position_column: ClassVar[str] = "__position"
+    partitions: ClassVar[int] = 16
+    max_depth: ClassVar[int] = 3
+    # sorting and deduplicating a partition takes several times its size on disk
+    memory_factor: ClassVar[int] = 4
+    # runs read at once by a merge, more runs are merged in several passes
+    merge_fan_in: ClassVar[int] = 64
+    min_batch_rows: ClassVar[int] = 128
+
+    class ExternalSortError(Exception):
+        pass
+
+    @staticmethod
+    def normalize_schema(schema: pa.Schema) -> pa.Schema:
+
+        # categoricals of different batches get different index widths, one common width keeps the batches compatible;
+        # a column without any value in the first batch is a column of strings
+        for index, schema_field in enumerate(schema):
+            if pa.types.is_dictionary(schema_field.type):
+                value_type = schema_field.type.value_type
+                value_type = pa.string() if pa.types.is_null(value_type) else value_type
+                schema = schema.set(index, schema_field.with_type(pa.dictionary(pa.int32(), value_type)))
+            elif pa.types.is_null(schema_field.type):
+                schema = schema.set(index, schema_field.with_type(pa.string()))
+        return schema
+
+    @staticmethod
+    def _spill_schema(schema: pa.Schema) -> pa.Schema:
+
+        # dictionary columns are spilled as indices into one dictionary per column, kept in memory by the sort
+        for index, schema_field in enumerate(schema):
+            if pa.types.is_dictionary(schema_field.type):
+                schema = schema.set(index, schema_field.with_type(schema_field.type.index_type))
+        return schema
+
+    @staticmethod
+    def _encode_dictionaries(table: pa.Table, dictionaries: dict[str, pa.Array | None]) -> pa.Table:
+
+        # the dictionary of every batch is merged into the one of its column, the indices are remapped onto it
+        for name in dictionaries:
+            column = table[name].combine_chunks()
+            dictionary = dictionaries[name]
+            if dictionary is None:
+                dictionary = dictionaries[name] = column.dictionary
+            else:
+                missing = column.dictionary.filter(pc.invert(pc.is_in(column.dictionary, value_set=dictionary)))
+                if len(missing):
+                    dictionary = dictionaries[name] = pa.concat_arrays([dictionary, missing])
+            indices = pc.index_in(column.dictionary, value_set=dictionary).take(column.indices)
+            table = table.set_column(table.schema.get_field_index(name), name, indices.cast(column.indices.type))
+        return table
+
+    @staticmethod
+    def _decode_dictionaries(table: pa.Table, dictionaries: dict[str, pa.Array | None]) -> pa.Table:
+        for name, dictionary in dictionaries.items():
+            column = pa.DictionaryArray.from_arrays(table[name].combine_chunks(), dictionary)
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+        return table
+
+    @classmethod
+    def _partition_ids(cls, table: pa.Table, key_columns: list[str], depth: int) -> np.ndarray:
+        keys = table.select(key_columns).to_pandas()
+        hash_key = f"external_sort_{depth:02}"
+        return (pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy() % cls.partitions)
+
+    @classmethod
+    def _partition(cls, tables: Iterable[pa.Table], directory: Path, schema: pa.Schema,  # noqa: PLR0913
+                   key_columns: list[str], depth: int) -> list[Path]:
+
+        # rows with the same key always end up in the same partition, so each partition is deduplicated on its own
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = [Path(directory, f"partition_{partition:02}.arrow") for partition in range(cls.partitions)]
+        writers = [pa.ipc.new_stream(str(path), schema) for path in paths]
+        try:
+            for table in tables:
+                partition_ids = cls._partition_ids(table, key_columns, depth)
+                order = np.argsort(partition_ids, kind="stable")
+                bounds = np.searchsorted(partition_ids[order], np.arange(cls.partitions + 1))
+                for partition, writer in enumerate(writers):
+                    if bounds[partition] < bounds[partition + 1]:
+                        writer.write_table(table.take(order[bounds[partition]:bounds[partition + 1]]))
+        finally:
+            for writer in writers:
+                writer.close()
+        return paths
+
+    @staticmethod
+    def _iter_tables(path: Path) -> Iterator[pa.Table]:
+
+        with pa.memory_map(str(path)) as source:
+            for batch in pa.ipc.open_stream(source):
+                yield pa.Table.from_batches([batch])
+
+    @classmethod
+    def _sort_indices(cls, table: pa.Table, sort_column: str) -> pa.Array:
+        return pc.sort_indices(table, sort_keys=[(sort_column, "ascending"), (cls.position_column, "ascending")],
+                               null_placement="at_end")
+
+    @classmethod
+    def _sorted_runs(cls, path: Path, schema: pa.Schema, sort_column: str, key_columns: list[str],  # noqa: PLR0913
+                     memory_limit: int, depth: int) -> list[Path]:
+
+        # a partition that is still too large is split again with a different hash
+        if path.stat().st_size * cls.memory_factor > memory_limit and depth < cls.max_depth:
+            paths = cls._partition(cls._iter_tables(path), path.with_suffix(""), schema, key_columns, depth + 1)
+            path.unlink()
+            return [run for partition_path in paths
+                    for run in cls._sorted_runs(partition_path, schema, sort_column, key_columns, memory_limit,
+                                                depth + 1)]
+
+        # keep the first row of every key in sort order, the same row drop_duplicates keeps after a stable sort
+        tables = list(cls._iter_tables(path))
+        path.unlink()
+        if not tables:
+            return []
+        table = pa.concat_tables(tables)
+        table = table.take(cls._sort_indices(table, sort_column))
+        duplicated = table.select(key_columns).to_pandas().duplicated().to_numpy()
+        if duplicated.any():
+            table = table.filter(pa.array(~duplicated))
+
+        run_path = path.with_suffix(".run")
+        with pa.ipc.new_stream(str(run_path), schema) as writer:
+            writer.write_table(table, max_chunksize=cls._batch_rows(table, memory_limit))
+        return [run_path]
+
+    @classmethod
+    def _batch_rows(cls, table: pa.Table, memory_limit: int) -> int:
+        # a merge buffers a batch of every run it reads, and at most merge_fan_in runs are read at once
+        row_size = max(1, table.nbytes // max(1, table.num_rows))
+        return max(cls.min_batch_rows, memory_limit // (2 * cls.merge_fan_in * cls.memory_factor * row_size))
+
+    @classmethod
+    def _rows_up_to(cls, table: pa.Table, sort_column: str, value: object, position: int) -> int:
+
+        # runs are sorted, so the rows not after the bound form a prefix; missing values sort last
+        values, positions = table[sort_column], table[cls.position_column]
+        if value is None:
+            mask = pc.or_(pc.is_valid(values), pc.less_equal(positions, position))
+        else:
+            mask = pc.or_(
+                pc.fill_null(pc.less(values, value), False),
+                pc.and_(pc.fill_null(pc.equal(values, value), False), pc.less_equal(positions, position)),
+            )
+        return pc.sum(mask).as_py() or 0
+
+    @classmethod
+    def _merge(cls, run_paths: list[Path], sort_column: str) -> Iterator[pa.Table]:
+
+        # k-way merge block by block: everything up to the smallest last row of the buffered blocks can be emitted
+        runs = {index: cls._iter_tables(run_path) for index, run_path in enumerate(run_paths)}
+        buffers: dict[int, pa.Table] = {}
+        while True:
+            for index in list(runs):
+                while index not in buffers or not buffers[index].num_rows:
+                    table = next(runs[index], None)
+                    if table is None:
+                        del runs[index]
+                        buffers.pop(index, None)
+                        break
+                    buffers[index] = table
+
+            if not buffers:
+                return
+
+            columns = [sort_column, cls.position_column]
+            bound = pa.concat_tables([buffer.slice(buffer.num_rows - 1).select(columns) for buffer in buffers.values()])
+            bound = bound.take(cls._sort_indices(bound, sort_column)).slice(0, 1).to_pylist()[0]
+
+            blocks = []
+            for index, buffer in buffers.items():
+                rows = cls._rows_up_to(buffer, sort_column, bound[sort_column], bound[cls.position_column])
+                blocks.append(buffer.slice(0, rows))
+                buffers[index] = buffer.slice(rows)
+
+            block = pa.concat_tables(blocks)
+            yield block.take(cls._sort_indices(block, sort_column))
+
+    @classmethod
+    def _coalesce(cls, tables: Iterable[pa.Table], memory_limit: int) -> Iterator[pa.Table]:
+
+        # the merge emits many small blocks, they are passed on in tables about the size of all merge buffers
+        pending, rows = [], 0
+        for table in tables:
+            pending.append(table)
+            rows += table.num_rows
+            if rows >= cls.merge_fan_in * cls._batch_rows(table, memory_limit):
+                yield pa.concat_tables(pending)
+                pending, rows = [], 0
+        if pending:
+            yield pa.concat_tables(pending)
+
+    @classmethod
+    def _merge_passes(cls, run_paths: list[Path], schema: pa.Schema, sort_column: str,
+                      memory_limit: int) -> list[Path]:
+
+        # runs are merged merge_fan_in at a time into longer runs, until the final merge reads few enough of them
+        merge_pass = 0
+        while len(run_paths) > cls.merge_fan_in:
+            merged_paths = []
+            for start in range(0, len(run_paths), cls.merge_fan_in):
+                group = run_paths[start:start + cls.merge_fan_in]
+                merged_path = group[0].with_name(f"merge_{merge_pass:02}_{start // cls.merge_fan_in:04}.run")
+                with pa.ipc.new_stream(str(merged_path), schema) as writer:
+                    for table in cls._merge(group, sort_column):
+                        writer.write_table(table, max_chunksize=cls._batch_rows(table, memory_limit))
+                for run_path in group:
+                    run_path.unlink()
+                merged_paths.append(merged_path)
+            run_paths = merged_paths
+            merge_pass += 1
+        return run_paths
+
+    @classmethod
+    def _to_tables(cls, frames: Iterable[pd.DataFrame], schema: pa.Schema, memory_limit: int,
+                   dictionaries: dict[str, pa.Array | None]) -> Iterator[pa.Table]:
+
+        position = 0
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            table = table.append_column(cls.position_column, pa.array(np.arange(position, position + len(frame))))
+            table = cls._encode_dictionaries(table.cast(schema), dictionaries)
+            position += len(frame)
+
+            # large frames are partitioned slice by slice
+            rows = cls._batch_rows(table, memory_limit) * cls.partitions
+            for offset in range(0, table.num_rows, rows):
+                yield table.slice(offset, rows)
+
+    @classmethod
+    def sort(  # noqa: PLR0913
+            cls,
+            frames: Iterable[pd.DataFrame],
+            directory: Path,
+            sort_column: str,
+            key_columns: list[str],
+            memory_limit: int,
+    ) -> Iterator[pd.DataFrame]:
+
+        # stable sort by sort_column followed by drop_duplicates on key_columns, with the sorted runs kept on disk
+        frames = iter(frames)
+        first_frame = next(frames, None)
+        if first_frame is None:
+            return
+
+        dtypes = {column: dtype for column, dtype in first_frame.dtypes.items()
+                  if not isinstance(dtype, pd.CategoricalDtype)}
+        schema = cls.normalize_schema(pa.Schema.from_pandas(first_frame, preserve_index=False))
+        schema = schema.append(pa.field(cls.position_column, pa.int64()))
+        dictionaries: dict[str, pa.Array | None] = {schema_field.name: None for schema_field in schema
+                                                    if pa.types.is_dictionary(schema_field.type)}
+        spill_schema = cls._spill_schema(schema)
+
+        try:
+            tables = cls._to_tables(chain([first_frame], frames), schema, memory_limit, dictionaries)
+            del first_frame
+            paths = cls._partition(tables, directory, spill_schema, key_columns, 0)
+            run_paths = [run_path for path in paths
+                         for run_path in cls._sorted_runs(path, spill_schema, sort_column, key_columns, memory_limit,
+                                                          0)]
+            run_paths = cls._merge_passes(run_paths, spill_schema, sort_column, memory_limit)
+
+            for merged in cls._coalesce(cls._merge(run_paths, sort_column), memory_limit):
+                table = cls._decode_dictionaries(merged.drop([cls.position_column]), dictionaries)
+                yield table.to_pandas().astype(dtypes)
+
+        except Exception as e:
+            error_message = f"Error during external sort: {e}"
+            raise cls.ExternalSortError(error_message) from None
+
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
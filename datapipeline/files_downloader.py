@@ -1,79 +1,275 @@
-import gzip
-import shutil
-from io import BytesIO
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
+from typing import Any, BinaryIO, ClassVar
 import requests
+import requests.adapters
 
 from tqdm import tqdm
 
 
 class FilesDownloader:
+    chunk_size: ClassVar[int] = 4 * 1024 * 1024
+    max_attempts: ClassVar[int] = 3
+    extract_files: ClassVar[bool] = True
+    manifest_file_name: ClassVar[str] = "manifest.json"
+    manifest: ClassVar[dict[str, dict[str, Any]]] = {}
+    manifest_lock: ClassVar[threading.Lock] = threading.Lock()
+
     class DownloadError(Exception):
         pass
 
     class ExtractAndSaveError(Exception):
         pass
 
+    @staticmethod
+    def _extracted_file_path(temp_directory: Path, file_name: str) -> Path:
+        return Path(temp_directory, file_name.rsplit(".", 1)[0])
+
+    @classmethod
+    def _load_manifest(cls, temp_directory: Path) -> None:
+        manifest_path = Path(temp_directory, cls.manifest_file_name)
+        try:
+            cls.manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        except (OSError, ValueError):
+            cls.manifest = {}
+
+    @classmethod
+    def _update_manifest(cls, temp_directory: Path, file_name: str, entry: dict[str, Any]) -> None:
+        with cls.manifest_lock:
+            cls.manifest[file_name] = entry
+            manifest_path = Path(temp_directory, cls.manifest_file_name)
+            partial_manifest_path = manifest_path.with_suffix(".partial")
+            partial_manifest_path.write_text(json.dumps(cls.manifest, indent=4, sort_keys=True))
+            partial_manifest_path.replace(manifest_path)
+
+    @classmethod
+    def _conditional_headers(cls, temp_directory: Path, file_name: str) -> dict[str, str]:
+
+        # ask the server for the file only if it changed since the download recorded in the manifest
+        entry = cls.manifest.get(file_name)
+        if not entry:
+            return {}
+        if cls.extract_files:
+            file_path, size = cls._extracted_file_path(temp_directory, file_name), entry.get("extracted_size")
+        else:
+            file_path, size = Path(temp_directory, file_name), entry.get("size")
+        if not file_path.exists() or file_path.stat().st_size != size:
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def _iter_hashed(chunks: Iterable[bytes], checksum: "hashlib._Hash") -> Iterator[bytes]:
+        for chunk in chunks:
+            checksum.update(chunk)
+            yield chunk
+
     @classmethod
-    def _extract_file_and_save(cls, temp_directory: Path, response_data: BytesIO, file_name: str) -> bool:
+    def _extract_file_and_save(cls, temp_directory: Path, chunks: Iterable[bytes], file_name: str) -> bool:
+        file_path = cls._extracted_file_path(temp_directory, file_name)
+        partial_file_path = file_path.with_suffix(f"{file_path.suffix}.partial")
         try:
-            extracted_file_name = file_name.rsplit(".", 1)[0]
-            file_path = Path(temp_directory, extracted_file_name)
-            with gzip.open(response_data, "rb") as compressed_file, \
-                 file_path.open("wb") as new_file:
-                shutil.copyfileobj(compressed_file, new_file)
+            # decompress chunks as they arrive, so memory stays bounded by the chunk size, not by the file size;
+            # archives that are kept compressed are still decompressed once to verify them
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            member_open = False
+            output_path = partial_file_path if cls.extract_files else Path(os.devnull)
+            with output_path.open("wb") as new_file:
+                for chunk in chunks:
+                    data = chunk
+                    while data:
+                        member_open = True
+                        new_file.write(decompressor.decompress(data))
+                        if not decompressor.eof:
+                            break
+                        # a gzip file can consist of several members, every member needs a new decompressor
+                        member_open = False
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                new_file.write(decompressor.flush())
+            if member_open:
+                raise zlib.error("compressed data ended before the end-of-stream marker was reached")
+            if cls.extract_files:
+                partial_file_path.replace(file_path)
             return True
+        except requests.RequestException:
+            partial_file_path.unlink(missing_ok=True)
+            raise
         except Exception as e:
+            partial_file_path.unlink(missing_ok=True)
             error_message = f"\033[91mError during extraction or saving of file: {file_name}, error: {e}\033[0m"
             raise cls.ExtractAndSaveError(error_message) from None
 
     @classmethod
-    def download_extract_and_save_files(cls, temp_directory: Path, files_to_download: list) -> bool:
+    def _iter_chunks(cls, response: requests.Response, pbar: tqdm, compressed_file: BinaryIO) -> Iterator[bytes]:
+        for chunk in response.iter_content(chunk_size=cls.chunk_size):
+            if chunk:
+                compressed_file.write(chunk)
+                pbar.update(len(chunk))
+                yield chunk
+
+    @classmethod
+    def _iter_partial_file(cls, partial_file_path: Path, size: int) -> Iterator[bytes]:
+        with partial_file_path.open("rb") as partial_file:
+            while size > 0 and (chunk := partial_file.read(min(cls.chunk_size, size))):
+                size -= len(chunk)
+                yield chunk
 
-        for url in files_to_download:
-            file_name = url.rsplit("/", 1)[1]
-            response_status_code = None
+    @classmethod
+    def _create_session(cls, max_concurrent_downloads: int) -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_concurrent_downloads,
+                                                pool_maxsize=max_concurrent_downloads)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
-            print(f"\n\033[93m{file_name}\033[0m", flush=True)
+    @classmethod
+    def _transfer_file(cls, session: requests.Session, temp_directory: Path, url: str, position: int) -> bool:
+        file_name = url.rsplit("/", 1)[1]
+        partial_file_path = Path(temp_directory, f"{file_name}.partial")
 
-            try:
-                response = requests.get(url, stream=True, timeout=300)
-                response_status_code = response.status_code
-                if response_status_code == 200:
-
-                    response_data = BytesIO()
-                    total_size = int(response.headers.get("content-length", 0))
-
-                    bar_format = "\033[92m{l_bar}{bar:10}{r_bar}{bar:-10b}\033[0m"
-                    with tqdm(total=total_size, unit="B", unit_scale=True, desc="Downloading",
-                              bar_format=bar_format) as pbar:
-                        current_downloaded_size = 0
-                        for chunk in response.iter_content(chunk_size=1024):
-                            if chunk:
-                                current_chunk_size = len(chunk)
-                                current_downloaded_size += current_chunk_size
-                                pbar.update(current_chunk_size)
-                                response_data.write(chunk)
-                        pbar.clear()
-                        pbar.close()
-
-                    response_data.seek(0)
-                    print(f"{file_name} downloaded", flush=True)
-                    if not cls._extract_file_and_save(temp_directory, response_data, file_name):
-                        return False
-
-            except Exception as e:
-                error_message = f"\033[91mError during download: {response_status_code}, {e}\033[0m"
-                raise cls.DownloadError(error_message) from None
+        # continue an interrupted transfer from the bytes already on disk, if the server still has the version they
+        # belong to; otherwise If-Range makes it send the whole file
+        partial = cls.manifest.get(file_name, {}).get("partial", {})
+        validator = partial.get("etag") or partial.get("last_modified")
+        resume_from = partial_file_path.stat().st_size if partial_file_path.exists() and validator else 0
+        if resume_from:
+            headers = {"Range": f"bytes={resume_from}-", "If-Range": validator}
+        else:
+            headers = cls._conditional_headers(temp_directory, file_name)
+
+        with session.get(url, stream=True, timeout=300, headers=headers) as response:
+            if response.status_code == 304:
+                print(f"{file_name} not modified, download skipped", flush=True)
+                return True
+            if response.status_code == 416:
+                partial_file_path.unlink()
+            response.raise_for_status()
+            if response.status_code != 206:
+                resume_from = 0
+                cls._update_manifest(temp_directory, file_name, {**cls.manifest.get(file_name, {}), "partial": {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                }})
 
+            total_size = resume_from + int(response.headers.get("content-length", 0))
+            bar_format = "\033[92m{l_bar}{bar:10}{r_bar}{bar:-10b}\033[0m"
+            with tqdm(total=total_size, initial=resume_from, unit="B", unit_scale=True, desc=file_name,
+                      position=position, bar_format=bar_format) as pbar, \
+                 partial_file_path.open("ab" if resume_from else "wb") as compressed_file:
+                checksum = hashlib.sha256()
+                chunks = cls._iter_hashed(chain(cls._iter_partial_file(partial_file_path, resume_from),
+                                                cls._iter_chunks(response, pbar, compressed_file)), checksum)
+                extracted = cls._extract_file_and_save(temp_directory, chunks, file_name)
+                pbar.clear()
+                pbar.close()
+
+        # the same version of the file has to arrive with the same content as before
+        size = partial_file_path.stat().st_size
+        file_path = cls._extracted_file_path(temp_directory, file_name)
+        previous = cls.manifest.get(file_name, {})
+        if (previous.get("etag") and previous["etag"] == response.headers.get("etag") and previous.get("size") == size
+                and previous.get("checksum") != f"sha256:{checksum.hexdigest()}"):
+            if cls.extract_files:
+                file_path.unlink(missing_ok=True)
+            error_message = f"\033[91mChecksum of file {file_name} does not match the manifest\033[0m"
+            raise cls.ExtractAndSaveError(error_message)
+
+        # keep only one copy of the file, either extracted or compressed
+        if cls.extract_files:
+            partial_file_path.unlink()
+            Path(temp_directory, file_name).unlink(missing_ok=True)
+        else:
+            partial_file_path.replace(Path(temp_directory, file_name))
+            file_path.unlink(missing_ok=True)
+
+        cls._update_manifest(temp_directory, file_name, {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "size": size,
+            "checksum": f"sha256:{checksum.hexdigest()}",
+            "extracted_size": file_path.stat().st_size if cls.extract_files else None,
+        })
+
+        print(f"{file_name} downloaded{' and extracted' if cls.extract_files else ''}", flush=True)
+        return extracted
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500 or error.response.status_code == 416
         return True
 
+    @classmethod
+    def _download_file(cls, session: requests.Session, temp_directory: Path, url: str, position: int) -> bool:
+        file_name = url.rsplit("/", 1)[1]
+
+        for attempt in range(1, cls.max_attempts + 1):
+            try:
+                return cls._transfer_file(session, temp_directory, url, position)
+
+            except (requests.RequestException, cls.ExtractAndSaveError) as e:
+                # a partial file that can not be decompressed belongs to another version of the file, start over
+                if isinstance(e, cls.ExtractAndSaveError):
+                    Path(temp_directory, f"{file_name}.partial").unlink(missing_ok=True)
+                if attempt == cls.max_attempts or not cls._is_retryable(e):
+                    error_message = f"\033[91mError during download: {file_name}, {e}\033[0m"
+                    raise cls.DownloadError(error_message) from None
+                print(f"\033[93mRetrying download of {file_name} ({attempt}/{cls.max_attempts}): {e}\033[0m",
+                      flush=True)
+
+        return False
+
+    @classmethod
+    def download_extract_and_save_files(
+            cls,
+            temp_directory: Path,
+            files_to_download: list,
+            max_concurrent_downloads: int = 4,
+            extract_files: bool = True,
+    ) -> bool:
+
+        cls.extract_files = extract_files
+        Path(temp_directory).mkdir(parents=True, exist_ok=True)
+        cls._load_manifest(temp_directory)
+
+        try:
+            with cls._create_session(max_concurrent_downloads) as session, \
+                 ThreadPoolExecutor(max_workers=max_concurrent_downloads) as executor:
+                futures = [
+                    executor.submit(cls._download_file, session, temp_directory, url, position)
+                    for position, url in enumerate(files_to_download)
+                ]
+                return all(future.result() for future in futures)
+
+        except cls.DownloadError:
+            raise
+
+        except Exception as e:
+            error_message = f"\033[91mError during download: {e}\033[0m"
+            raise cls.DownloadError(error_message) from None
+
     @staticmethod
     def delete_files(temp_directory: Path, files_to_delete: list) -> None:
         for url in files_to_delete:
-            file_path = Path(temp_directory, url.split("/")[-1].replace(".gz", ""))
-            if file_path.exists():
+            file_name = url.split("/")[-1]
+            file_paths = [Path(temp_directory, file_name.replace(".gz", "")), Path(temp_directory, file_name)]
+            existing_file_paths = [file_path for file_path in file_paths if file_path.exists()]
+            for file_path in existing_file_paths:
                 file_path.unlink()
                 print(f"File {file_path} deleted.")
-            else:
-                print(f"File {file_path} does not exist.")
+            if not existing_file_paths:
+                print(f"File {file_paths[0]} does not exist.")
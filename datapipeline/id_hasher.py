@@ -0,0 +1,40 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class IdHasher:
+
+    @staticmethod
+    def _digests(values: np.ndarray) -> np.ndarray:
+        md5 = hashlib.md5
+        return np.array([md5(value.encode("utf-8")).hexdigest() for value in values], dtype=object)
+
+    @classmethod
+    def hash_values(cls, values: pd.Series | np.ndarray) -> np.ndarray:
+
+        # every distinct value is hashed once and its digest is mapped back to its rows, nulls are passed through
+        result = np.asarray(values, dtype=object).copy()
+        codes, uniques = pd.factorize(result)
+        valid = codes >= 0
+        result[valid] = cls._digests(np.asarray(uniques, dtype=object))[codes[valid]]
+        return result
+
+    @staticmethod
+    def _to_arrow_string(s: pd.Series) -> pa.Array:
+        if pd.api.types.is_integer_dtype(s.dtype) or isinstance(s.dtype, pd.StringDtype):
+            return pc.cast(pa.array(s), pa.string())
+        try:
+            return pa.array(s, type=pa.string())
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            return pa.array(s.astype(str), type=pa.string())
+
+    @classmethod
+    def hash_columns(cls, df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+
+        # the columns are concatenated in Arrow, then every combined value is hashed like a single column
+        combined = pc.binary_join_element_wise(*[cls._to_arrow_string(df[column]) for column in columns], "")
+        return cls.hash_values(combined.to_numpy(zero_copy_only=False))
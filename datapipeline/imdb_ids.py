@@ -0,0 +1,48 @@
+from typing import ClassVar
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class ImdbIds:
+    prefixes: ClassVar[dict[str, str]] = {"tconst": "tt", "parentTconst": "tt", "titleId": "tt", "nconst": "nm"}
+    digits: ClassVar[int] = 7
+
+    class ImdbIdError(Exception):
+        pass
+
+    @classmethod
+    def _decode_array(cls, array: pa.Array | pa.ChunkedArray, prefix: str) -> pa.ChunkedArray:
+        numbers = pc.utf8_lpad(pc.cast(array, pa.string()), width=cls.digits, padding="0")
+        return pc.binary_join_element_wise(prefix, numbers, "")
+
+    @classmethod
+    def encode(cls, array: pa.Array | pa.ChunkedArray, prefix: str) -> pa.Array | pa.ChunkedArray:
+
+        # tt0000001 -> 1, only ids that are restored to exactly the same string are encoded
+        try:
+            numbers = pc.cast(pc.utf8_slice_codeunits(array, len(prefix)), pa.int32())
+            restored = cls._decode_array(numbers, prefix)
+            if pc.all(pc.equal(restored, pc.cast(array, pa.string()))).as_py() is not False:
+                return numbers
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+
+        error_message = f"Ids can not be encoded as integers, expected ids like {prefix}{'1'.zfill(cls.digits)}"
+        raise cls.ImdbIdError(error_message)
+
+    @classmethod
+    def encode_table(cls, table: pa.Table) -> pa.Table:
+        for column, prefix in cls.prefixes.items():
+            if column in table.column_names:
+                index = table.column_names.index(column)
+                table = table.set_column(index, column, cls.encode(table[column], prefix))
+        return table
+
+    @classmethod
+    def decode(cls, s: pd.Series, prefix: str) -> pd.Series:
+
+        # restores the string form of integer ids, e.g. for Parquet files written with integer ids
+        array = pa.array(s, type=pa.int64(), from_pandas=True)
+        return pd.Series(cls._decode_array(array, prefix), index=s.index, dtype=pd.StringDtype("pyarrow"))
@@ -0,0 +1,164 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import ClassVar
+
+from .abstract_table import AbstractTable
+from .files_downloader import FilesDownloader
+from .source_reader import SourceReader
+
+
+class OutputCache:
+    directory_name: ClassVar[str] = "cache"
+    checksums_file_name: ClassVar[str] = "checksums.json"
+    chunk_size: ClassVar[int] = 4 * 1024 * 1024
+    # parameters that change the content of the outputs
+    parameters: ClassVar[list[str]] = ["row_limit_size", "batch_size", "debug", "integer_ids", "partitioned_output"]
+
+    class OutputCacheError(Exception):
+        pass
+
+    @classmethod
+    def _directory(cls, temp_directory: Path) -> Path:
+        return Path(temp_directory, cls.directory_name)
+
+    @classmethod
+    def _file_checksum(cls, file_path: Path) -> str:
+        checksum = hashlib.sha256()
+        with file_path.open("rb") as source_file:
+            while chunk := source_file.read(cls.chunk_size):
+                checksum.update(chunk)
+        return f"sha256:{checksum.hexdigest()}"
+
+    @classmethod
+    def _source_checksums(cls, temp_directory: Path, file_names: list[str]) -> dict[str, str]:
+
+        # the checksum of the download is reused while the file has the size recorded in the manifest, other files
+        # are hashed once and recorded with their size and modification time
+        manifest_path = Path(temp_directory, FilesDownloader.manifest_file_name)
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        checksums_path = Path(cls._directory(temp_directory), cls.checksums_file_name)
+        recorded = json.loads(checksums_path.read_text()) if checksums_path.exists() else {}
+
+        checksums = {}
+        for file_name in file_names:
+            file_path = SourceReader.source_path(temp_directory, file_name)
+            stat = file_path.stat()
+            entry = manifest.get(f"{file_name}.gz", {})
+            size = entry.get("size") if file_path.suffix == ".gz" else entry.get("extracted_size")
+            if entry.get("checksum") and size == stat.st_size:
+                checksums[file_name] = entry["checksum"]
+                continue
+
+            entry = recorded.get(file_path.name, {})
+            if entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+                print(f"Hashing {file_path.name} for output cache...", flush=True)
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "checksum": cls._file_checksum(file_path)}
+                recorded[file_path.name] = entry
+            checksums[file_name] = entry["checksum"]
+
+        checksums_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = checksums_path.with_suffix(".partial")
+        partial_path.write_text(json.dumps(recorded, indent=4, sort_keys=True))
+        partial_path.replace(checksums_path)
+        return checksums
+
+    @staticmethod
+    def _code_checksum(table: type[AbstractTable]) -> str:
+
+        # the module of the table and the modules it shares with all tables, other tables do not invalidate it
+        table_path = Path(inspect.getfile(table))
+        paths = [path for path in sorted(table_path.parent.glob("*.py")) if not path.name.startswith("table_")]
+        checksum = hashlib.sha256()
+        for path in [table_path, *paths]:
+            checksum.update(path.read_bytes())
+        return checksum.hexdigest()
+
+    @classmethod
+    def key(cls, table: type[AbstractTable], file_name: str, second_file_name: str | None) -> str:
+        try:
+            inputs = {
+                "table": table.__name__,
+                "files": [file_name, second_file_name],
+                "checksums": cls._source_checksums(table.temp_directory, table.source_files(file_name)),
+                "parameters": {name: getattr(table, name) for name in cls.parameters},
+                "code": cls._code_checksum(table),
+            }
+        except Exception as e:
+            error_message = f"Error during hashing of inputs of table {table.__name__}: {e}"
+            raise cls.OutputCacheError(error_message) from None
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _copy(source_path: Path, target_path: Path) -> None:
+
+        # partitioned outputs are directories
+        if source_path.is_dir():
+            shutil.copytree(source_path, target_path)
+        else:
+            shutil.copyfile(source_path, target_path)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+    @classmethod
+    def restore(cls, table: type[AbstractTable], key: str) -> bool:
+
+        entry_path = Path(cls._directory(table.temp_directory), key)
+        if not entry_path.is_dir():
+            return False
+
+        # the outputs are copied, tables overwrite their files in place and would corrupt hard links
+        try:
+            for output_path in table.output_paths():
+                cls._remove(output_path)
+            for cached_path in sorted(entry_path.glob("*.parquet")):
+                cls._copy(cached_path, Path(table.temp_directory, cached_path.name))
+            os.utime(entry_path)
+        except Exception as e:
+            error_message = f"Error during restoring of table {table.__name__} from output cache: {e}"
+            raise cls.OutputCacheError(error_message) from None
+
+        print(f"Table {table.__name__} restored from output cache", flush=True)
+        return True
+
+    @classmethod
+    def store(cls, table: type[AbstractTable], key: str) -> None:
+
+        entry_path = Path(cls._directory(table.temp_directory), key)
+        partial_path = entry_path.with_suffix(".partial")
+        try:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            partial_path.mkdir(parents=True)
+            for output_path in table.output_paths():
+                cls._copy(output_path, Path(partial_path, output_path.name))
+            shutil.rmtree(entry_path, ignore_errors=True)
+            partial_path.replace(entry_path)
+        except Exception as e:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            error_message = f"Error during storing of table {table.__name__} in output cache: {e}"
+            raise cls.OutputCacheError(error_message) from None
+
+    @classmethod
+    def evict(cls, temp_directory: Path, max_size: int) -> None:
+
+        # least recently stored or restored entries go first
+        entries = [(entry_path.stat().st_mtime_ns, entry_path)
+                   for entry_path in cls._directory(temp_directory).iterdir()
+                   if entry_path.is_dir() and entry_path.suffix != ".partial"]
+        sizes = {entry_path: sum(path.stat().st_size for path in entry_path.rglob("*") if path.is_file())
+                 for _, entry_path in entries}
+        size = sum(sizes.values())
+        for _, entry_path in sorted(entries):
+            if size <= max_size:
+                break
+            print(f"Evicting {entry_path.name} from output cache", flush=True)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            size -= sizes[entry_path]
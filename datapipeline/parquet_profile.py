@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+@dataclass(frozen=True)
+class ParquetProfile:
+    compression: str = "zstd"
+    compression_level: int | None = 9
+    row_group_size: int = 1_000_000
+    # None encodes the categorical columns with a dictionary, high-cardinality ids fall back to plain pages anyway
+    use_dictionary: bool | list[str] | None = None
+    write_statistics: bool = True
+    write_page_index: bool = True
+    # the order the rows are written in, recorded in the row group metadata for the query engines
+    sorting_columns: tuple[str, ...] = ()
+    # the hive partitions of the partitioned output layout, 0 does not limit the size of the files
+    partition_columns: tuple[str, ...] = ()
+    max_rows_per_file: int = 0
+
+    def writer_options(self, schema: pa.Schema) -> dict[str, Any]:
+        use_dictionary = self.use_dictionary
+        if use_dictionary is None:
+            use_dictionary = [field.name for field in schema if pa.types.is_dictionary(field.type)]
+        sorting_columns = None
+        if self.sorting_columns and set(self.sorting_columns).issubset(schema.names):
+            sort_keys = [(column, "ascending") for column in self.sorting_columns]
+            sorting_columns = pq.SortingColumn.from_ordering(schema, sort_keys, null_placement="at_end")
+        return {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": use_dictionary,
+            "write_statistics": self.write_statistics,
+            "write_page_index": self.write_page_index,
+            "sorting_columns": sorting_columns,
+        }
@@ -0,0 +1,175 @@
+import json
+import shutil
+from collections.abc import Iterable, Iterator
+from itertools import chain
+from pathlib import Path
+from types import TracebackType
+from typing import ClassVar
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .external_sorter import ExternalSorter
+from .parquet_profile import ParquetProfile
+
+
+class ParquetStreamWriter:
+    # the directory name pyarrow gives to the rows without a value of a partition column
+    null_partition: ClassVar[str] = "__HIVE_DEFAULT_PARTITION__"
+
+    # one open ParquetWriter per table, frames are appended as row groups of the size of the writer profile
+    def __init__(self, file_path: Path, profile: ParquetProfile) -> None:
+        self.file_path = file_path
+        self.partial_path = file_path.with_suffix(".partial")
+        self.profile = profile
+        self.writer: pq.ParquetWriter | None = None
+        self.pending: list[pa.Table] = []
+        self.pending_rows = 0
+        self.rows = 0
+
+    def __enter__(self) -> "ParquetStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, table: pa.Table) -> None:
+        if self.writer is None:
+            schema = ExternalSorter.normalize_schema(table.schema)
+            self.writer = pq.ParquetWriter(self.partial_path, schema, **self.profile.writer_options(schema))
+        self.pending.append(table.cast(self.writer.schema))
+        self.pending_rows += table.num_rows
+        self.rows += table.num_rows
+
+        # full row groups are written as soon as they are complete, the rest waits for the next frames
+        row_group_size = self.profile.row_group_size
+        if self.pending_rows >= row_group_size:
+            table = pa.concat_tables(self.pending)
+            rows = self.pending_rows - self.pending_rows % row_group_size
+            self.writer.write_table(table.slice(0, rows), row_group_size=row_group_size)
+            self.pending, self.pending_rows = [table.slice(rows)], self.pending_rows - rows
+
+    def close(self) -> None:
+
+        # the file appears under its name only once it is complete
+        if self.writer is None:
+            return
+        if self.pending_rows:
+            self.writer.write_table(pa.concat_tables(self.pending), row_group_size=self.profile.row_group_size)
+        self.writer.close()
+        self.writer, self.pending, self.pending_rows = None, [], 0
+        if self.file_path.is_dir():
+            shutil.rmtree(self.file_path)
+        self.partial_path.replace(self.file_path)
+        self._remove_parts(self.file_path)
+
+    def abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.partial_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _remove_parts(file_path: Path) -> None:
+
+        # the one file per batch of earlier runs, which would otherwise be read together with the new output
+        for part_path in file_path.parent.glob(f"{file_path.stem}_[0-9][0-9]*.parquet"):
+            if part_path.stem[len(file_path.stem) + 1:].isdigit():
+                part_path.unlink()
+
+    @staticmethod
+    def _partitioning(schema: pa.Schema, partition_columns: tuple[str, ...]) -> ds.Partitioning:
+
+        # categorical partition values are read back as strings and cast to the schema of the dataset
+        fields = [schema.field(column) for column in partition_columns]
+        fields = [field.with_type(pa.string()) if pa.types.is_dictionary(field.type) else field for field in fields]
+        return ds.partitioning(pa.schema(fields), flavor="hive")
+
+    @staticmethod
+    def _file_schema(schema: pa.Schema, partition_columns: tuple[str, ...]) -> pa.Schema:
+
+        # plain readers infer the partition columns from the directory names, their pandas types would not match
+        pandas_metadata = schema.pandas_metadata
+        if pandas_metadata is None:
+            return schema.remove_metadata()
+        pandas_metadata["columns"] = [column for column in pandas_metadata["columns"]
+                                      if column["name"] not in partition_columns]
+        return schema.with_metadata({b"pandas": json.dumps(pandas_metadata).encode()})
+
+    @classmethod
+    def _lift_null_partitions(cls, dataset_path: Path) -> None:
+
+        # a null partition is read back as a dictionary holding a null, which plain readers cannot convert to pandas,
+        # without the directory level the missing partition column is read as null
+        for file_path in sorted(dataset_path.rglob("*.parquet")):
+            directories = file_path.relative_to(dataset_path).parts[:-1]
+            kept = [directory for directory in directories if directory.partition("=")[2] != cls.null_partition]
+            if len(kept) < len(directories):
+                target_path = Path(dataset_path, *kept, file_path.name)
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.replace(target_path)
+        for directory_path in sorted(dataset_path.rglob("*"), reverse=True):
+            if directory_path.is_dir() and not any(directory_path.iterdir()):
+                directory_path.rmdir()
+
+    @classmethod
+    def write_partitioned(cls, dataset_path: Path, tables: Iterable[pa.Table], profile: ParquetProfile) -> int:
+
+        # one directory per value of the partition columns, with at most max_rows_per_file rows in every file
+        tables = iter(tables)
+        first_table = next(tables, None)
+        if first_table is None:
+            return 0
+        # the complete pandas metadata stays in the schema summary, where the readers of this class find it
+        schema = ExternalSorter.normalize_schema(first_table.schema)
+        dataset_schema = cls._file_schema(schema, profile.partition_columns)
+        file_schema = pa.schema([field for field in dataset_schema if field.name not in profile.partition_columns])
+        rows = 0
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            nonlocal rows
+            for table in chain([first_table], tables):
+                rows += table.num_rows
+                yield from table.cast(dataset_schema).to_batches()
+
+        partial_path = dataset_path.with_suffix(".partial")
+        shutil.rmtree(partial_path, ignore_errors=True)
+        try:
+            max_rows_per_file = profile.max_rows_per_file
+            ds.write_dataset(
+                pa.RecordBatchReader.from_batches(dataset_schema, batches()),
+                partial_path,
+                format="parquet",
+                partitioning=cls._partitioning(schema, profile.partition_columns),
+                file_options=ds.ParquetFileFormat().make_write_options(**profile.writer_options(file_schema)),
+                max_rows_per_file=max_rows_per_file,
+                max_rows_per_group=min(profile.row_group_size, max_rows_per_file or profile.row_group_size),
+                existing_data_behavior="error",
+            )
+            cls._lift_null_partitions(partial_path)
+            # readers take the column types and the column order from the schema summary
+            pq.write_metadata(schema, Path(partial_path, "_common_metadata"))
+        except Exception:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            raise
+
+        if dataset_path.is_dir():
+            shutil.rmtree(dataset_path)
+        else:
+            dataset_path.unlink(missing_ok=True)
+        partial_path.replace(dataset_path)
+        cls._remove_parts(dataset_path)
+        return rows
+
+    @classmethod
+    def read(cls, path: Path, partition_columns: tuple[str, ...]) -> pa.Table:
+        if not path.is_dir():
+            return pq.read_table(path)
+        schema = pq.read_schema(Path(path, "_common_metadata"))
+        dataset = ds.dataset(path, format="parquet", partitioning=cls._partitioning(schema, partition_columns))
+        return dataset.to_table().select(schema.names).cast(schema)
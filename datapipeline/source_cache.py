@@ -0,0 +1,135 @@
+from pathlib import Path
+from typing import ClassVar
+
+import pandas as pd
+import pyarrow as pa
+
+from .source_reader import SourceReader
+from .stage_profiler import StageProfiler
+
+
+class SourceCache:
+    columns: ClassVar[dict[str, set[str]]] = {}
+    consumers: ClassVar[dict[str, int]] = {}
+    frames: ClassVar[dict[str, pd.DataFrame]] = {}
+    parsed_rows: ClassVar[dict[str, int | None]] = {}
+
+    class SourceCacheError(Exception):
+        pass
+
+    @classmethod
+    def register(cls, file_name: str, columns: list[str]) -> None:
+        cls.columns.setdefault(file_name, set()).update(columns)
+        cls.consumers[file_name] = cls.consumers.get(file_name, 0) + 1
+
+    @classmethod
+    def _is_cached(cls, file_name: str, columns: list[str], nrows: int | None) -> bool:
+        if file_name not in cls.frames:
+            return False
+        if not set(columns).issubset(cls.frames[file_name].columns):
+            return False
+        parsed_rows = cls.parsed_rows[file_name]
+        return parsed_rows is None or (nrows is not None and nrows <= parsed_rows)
+
+    @classmethod
+    def _parse(cls, temp_directory: Path, file_name: str, usecols: set[str], nrows: int | None) -> pd.DataFrame:
+        print(f"Parsing {file_name} into source cache...", flush=True)
+        try:
+            with StageProfiler.stage(file_name, "parse") as stage:
+                df = SourceReader.read(temp_directory, file_name, sorted(usecols), nrows)
+                stage.rows_out = df.shape[0]
+        except SourceReader.SourceReaderError as e:
+            raise cls.SourceCacheError(str(e)) from None
+        return df
+
+    @staticmethod
+    def _spill_path(temp_directory: Path, file_name: str) -> Path:
+        return Path(temp_directory, f"{file_name}.arrow")
+
+    @classmethod
+    def spill(cls, temp_directory: Path, file_name: str, columns: list[str], nrows: int | None) -> None:
+
+        # parse once and keep the columns on disk, so that worker processes memory-map them instead of parsing again
+        df = cls._parse(temp_directory, file_name, set(columns), nrows)
+        spill_path = cls._spill_path(temp_directory, file_name)
+        partial_path = spill_path.with_suffix(".partial")
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            del df
+            if nrows is not None:
+                table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"nrows": str(nrows).encode()})
+            with pa.OSFile(str(partial_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            partial_path.replace(spill_path)
+        except Exception as e:
+            partial_path.unlink(missing_ok=True)
+            error_message = f"Error during spilling of file: {file_name}, error: {e}"
+            raise cls.SourceCacheError(error_message) from None
+
+    @staticmethod
+    def _spill_covers(spill_path: Path, columns: list[str], nrows: int | None) -> bool:
+
+        # a spill of the first rows of a source only serves reads of at most as many rows
+        with pa.memory_map(str(spill_path)) as source:
+            schema = pa.ipc.open_file(source).schema
+        if not set(columns).issubset(schema.names):
+            return False
+        spilled_rows = (schema.metadata or {}).get(b"nrows")
+        return spilled_rows is None or (nrows is not None and nrows <= int(spilled_rows))
+
+    @classmethod
+    def _read_spilled(cls, spill_path: Path, columns: list[str], nrows: int | None) -> pd.DataFrame:
+        with pa.memory_map(str(spill_path)) as source:
+            table = pa.ipc.open_file(source).read_all().select(columns)
+            if nrows is not None:
+                table = table.slice(0, nrows)
+            return SourceReader.to_pandas(table)
+
+    @classmethod
+    def read(cls, temp_directory: Path, file_name: str, columns: list[str], nrows: int | None) -> pd.DataFrame:
+
+        spill_path = cls._spill_path(temp_directory, file_name)
+        if file_name not in cls.frames and spill_path.exists() and cls._spill_covers(spill_path, columns, nrows):
+            return cls._read_spilled(spill_path, columns, nrows)
+
+        if not cls._is_cached(file_name, columns, nrows):
+            usecols = cls.columns.setdefault(file_name, set())
+            usecols.update(columns)
+
+            # parse all registered columns at once, so the remaining consumers are served from memory
+            cls.frames[file_name] = cls._parse(temp_directory, file_name, usecols, nrows)
+            cls.parsed_rows[file_name] = nrows
+
+        df = cls.frames[file_name][columns]
+        return df.head(nrows) if nrows is not None else df
+
+    @classmethod
+    def read_parsed(cls, temp_directory: Path, file_name: str, columns: list[str]) -> pd.DataFrame | None:
+
+        # columns of a source this run has already parsed, spilled or in memory, None when they would need a parse
+        spill_path = cls._spill_path(temp_directory, file_name)
+        if file_name not in cls.frames and spill_path.exists():
+            if not cls._spill_covers(spill_path, columns, None):
+                return None
+            return cls._read_spilled(spill_path, columns, None)
+        if cls._is_cached(file_name, columns, None):
+            return cls.frames[file_name][columns]
+        return None
+
+    @classmethod
+    def release(cls, file_name: str) -> None:
+        cls.consumers[file_name] = cls.consumers.get(file_name, 1) - 1
+        if cls.consumers[file_name] <= 0:
+            cls.frames.pop(file_name, None)
+            cls.parsed_rows.pop(file_name, None)
+            cls.consumers.pop(file_name, None)
+
+    @classmethod
+    def clear(cls, temp_directory: Path | None = None) -> None:
+        cls.columns.clear()
+        cls.consumers.clear()
+        cls.frames.clear()
+        cls.parsed_rows.clear()
+        if temp_directory is not None:
+            for spill_path in Path(temp_directory).glob("*.tsv.arrow"):
+                spill_path.unlink()
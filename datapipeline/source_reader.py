@@ -0,0 +1,180 @@
+from collections.abc import Iterator
+from pathlib import Path
+from typing import ClassVar
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+
+from .imdb_ids import ImdbIds
+
+
+class SourceReader:
+    null_values: ClassVar[list[str]] = ["\\N"]
+    block_size: ClassVar[int] = 16 * 1024 * 1024
+    integer_ids: ClassVar[bool] = False
+    # repeated values are parsed once into a dictionary, pandas receives them as categoricals
+    dictionary: ClassVar[pa.DataType] = pa.dictionary(pa.int32(), pa.string())
+    schemas: ClassVar[dict[str, dict[str, pa.DataType]]] = {
+        "title.basics.tsv": {
+            "tconst": pa.string(),
+            "titleType": dictionary,
+            "primaryTitle": pa.string(),
+            "originalTitle": pa.string(),
+            "isAdult": pa.int64(),
+            "startYear": pa.int64(),
+            "endYear": pa.int64(),
+            "runtimeMinutes": pa.string(),
+            "genres": dictionary,
+        },
+        "title.ratings.tsv": {
+            "tconst": pa.string(),
+            "averageRating": pa.float64(),
+            "numVotes": pa.int64(),
+        },
+        "title.episode.tsv": {
+            "tconst": pa.string(),
+            "parentTconst": pa.string(),
+            "seasonNumber": pa.int64(),
+            "episodeNumber": pa.int64(),
+        },
+        "title.akas.tsv": {
+            "titleId": pa.string(),
+            "ordering": pa.int64(),
+            "title": pa.string(),
+            "region": dictionary,
+            "language": dictionary,
+            "types": pa.string(),
+            "attributes": pa.string(),
+            "isOriginalTitle": pa.int64(),
+        },
+        "title.principals.tsv": {
+            "tconst": pa.string(),
+            "ordering": pa.int64(),
+            "nconst": pa.string(),
+            "category": dictionary,
+            "job": dictionary,
+            "characters": pa.string(),
+        },
+        "name.basics.tsv": {
+            "nconst": pa.string(),
+            "primaryName": pa.string(),
+            "birthYear": pa.int64(),
+            "deathYear": pa.int64(),
+            "primaryProfession": dictionary,
+            "knownForTitles": pa.string(),
+        },
+    }
+    pandas_dtypes: ClassVar[dict[pa.DataType, object]] = {
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.large_string(): pd.StringDtype("pyarrow"),
+        pa.int64(): pd.Int64Dtype(),
+        pa.int32(): pd.Int32Dtype(),
+    }
+
+    class SourceReaderError(Exception):
+        pass
+
+    @staticmethod
+    def source_path(temp_directory: Path, file_name: str) -> Path:
+
+        # sources kept compressed by FilesDownloader are read from the archive, decompressed on the fly
+        file_path = Path(temp_directory, file_name)
+        compressed_file_path = Path(temp_directory, f"{file_name}.gz")
+        if not file_path.exists() and compressed_file_path.exists():
+            return compressed_file_path
+        return file_path
+
+    @classmethod
+    def _options(
+            cls,
+            file_name: str,
+            columns: list[str],
+            use_threads: bool,
+    ) -> tuple[pyarrow.csv.ReadOptions, pyarrow.csv.ParseOptions, pyarrow.csv.ConvertOptions]:
+
+        # IMDb files are not quoted, a quote character is part of the value
+        schema = cls.schemas.get(file_name, {})
+        read_options = pyarrow.csv.ReadOptions(use_threads=use_threads, block_size=cls.block_size)
+        parse_options = pyarrow.csv.ParseOptions(delimiter="\t", quote_char=False)
+        convert_options = pyarrow.csv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: schema[column] for column in columns if column in schema},
+            null_values=cls.null_values,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        )
+        return read_options, parse_options, convert_options
+
+    @classmethod
+    def to_pandas(cls, table: pa.Table) -> pd.DataFrame:
+        return table.to_pandas(types_mapper=cls.pandas_dtypes.get)
+
+    @classmethod
+    def _encode_ids(cls, table: pa.Table) -> pa.Table:
+
+        # in integer id mode tconst, nconst and their references are parsed into int32 keys
+        return ImdbIds.encode_table(table) if cls.integer_ids else table
+
+    @classmethod
+    def read(cls, temp_directory: Path, file_name: str, columns: list[str], nrows: int | None) -> pd.DataFrame:
+
+        file_path = cls.source_path(temp_directory, file_name)
+        try:
+            if nrows is None:
+                # the whole file is parsed by multiple threads at once
+                read_options, parse_options, convert_options = cls._options(file_name, columns, use_threads=True)
+                table = pyarrow.csv.read_csv(file_path, read_options, parse_options, convert_options)
+            else:
+                record_batches, rows = [], 0
+                for record_batch in cls._iter_record_batches(file_path, file_name, columns):
+                    record_batches.append(record_batch)
+                    rows += record_batch.num_rows
+                    if rows >= nrows:
+                        break
+                table = pa.Table.from_batches(record_batches, cls._schema(file_name, columns)).slice(0, nrows)
+            table = cls._encode_ids(table)
+
+        except Exception as e:
+            error_message = f"Error during parsing of file: {file_name}, error: {e}"
+            raise cls.SourceReaderError(error_message) from None
+
+        return cls.to_pandas(table)
+
+    @classmethod
+    def _schema(cls, file_name: str, columns: list[str]) -> pa.Schema | None:
+        schema = cls.schemas.get(file_name)
+        if schema is None or not set(columns).issubset(schema):
+            return None
+        return pa.schema([(column, schema[column]) for column in columns])
+
+    @classmethod
+    def _iter_record_batches(cls, file_path: Path, file_name: str, columns: list[str]) -> Iterator[pa.RecordBatch]:
+        read_options, parse_options, convert_options = cls._options(file_name, columns, use_threads=True)
+        with pyarrow.csv.open_csv(file_path, read_options, parse_options, convert_options) as reader:
+            yield from reader
+
+    @classmethod
+    def read_batches(cls, temp_directory: Path, file_name: str, columns: list[str],
+                     batch_size: int) -> Iterator[pd.DataFrame]:
+
+        # one pass over the file, record batches are regrouped into batches of exactly batch_size rows
+        file_path = cls.source_path(temp_directory, file_name)
+        try:
+            pending: list[pa.RecordBatch] = []
+            pending_rows = 0
+            for record_batch in cls._iter_record_batches(file_path, file_name, columns):
+                pending.append(record_batch)
+                pending_rows += record_batch.num_rows
+                while pending_rows >= batch_size:
+                    table = pa.Table.from_batches(pending)
+                    yield cls.to_pandas(cls._encode_ids(table.slice(0, batch_size)))
+                    pending = table.slice(batch_size).to_batches()
+                    pending_rows -= batch_size
+
+            if pending_rows:
+                yield cls.to_pandas(cls._encode_ids(pa.Table.from_batches(pending)))
+
+        except Exception as e:
+            error_message = f"Error during parsing of file: {file_name}, error: {e}"
+            raise cls.SourceReaderError(error_message) from None
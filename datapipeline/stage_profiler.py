@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+from typing import ClassVar, TypeVar
+
+resource: ModuleType | None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass
+class StageRecord:
+    table: str
+    stage: str
+    rows_in: int = 0
+    rows_out: int = 0
+    calls: int = 1
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    # how far the stage raised the peak resident set size of its process
+    peak_rss_delta: int = 0
+    read_bytes: int = 0
+    written_bytes: int = 0
+
+
+class StageProfiler:
+    T = TypeVar("T")
+    directory_name: ClassVar[str] = "profile"
+    # None disables profiling, every process appends its records to a file of its own in this directory
+    directory: ClassVar[Path | None] = None
+    # the totals of the stages running inside each open stage of this process, innermost last
+    open_stages: ClassVar[list[StageRecord]] = []
+
+    class StageProfilerError(Exception):
+        pass
+
+    @classmethod
+    def configure(cls, directory: Path | None) -> None:
+        cls.directory = directory
+        cls.open_stages = []
+
+    @classmethod
+    def start(cls, temp_directory: Path) -> Path:
+        directory = Path(temp_directory, cls.directory_name, "stages")
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+        cls.directory = directory
+        return directory
+
+    @classmethod
+    def stop(cls) -> None:
+        if cls.directory is not None:
+            shutil.rmtree(cls.directory, ignore_errors=True)
+        cls.directory = None
+
+    @staticmethod
+    def _peak_rss() -> int:
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def _io_bytes() -> tuple[int, int]:
+
+        # bytes passed through read and write calls of the process, memory-mapped files are not counted
+        try:
+            counters = dict(line.split(": ") for line in Path("/proc/self/io").read_text().splitlines())
+        except OSError:
+            return 0, 0
+        return int(counters["rchar"]), int(counters["wchar"])
+
+    @classmethod
+    @contextmanager
+    def stage(cls, table: str, stage: str, rows_in: int = 0) -> Iterator[StageRecord]:
+
+        record = StageRecord(table, stage, rows_in)
+        if cls.directory is None:
+            yield record
+            return
+
+        # a stage records what it spends outside of the stages it encloses, so that the stages add up to the run
+        inner = StageRecord(table, stage)
+        cls.open_stages.append(inner)
+        peak_rss, (read_bytes, written_bytes) = cls._peak_rss(), cls._io_bytes()
+        wall_time, cpu_time = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            cls.open_stages.pop()
+        total = StageRecord(table, stage, wall_time=time.perf_counter() - wall_time,
+                            cpu_time=time.process_time() - cpu_time)
+        io_bytes = cls._io_bytes()
+        total.read_bytes, total.written_bytes = io_bytes[0] - read_bytes, io_bytes[1] - written_bytes
+        if cls.open_stages:
+            outer = cls.open_stages[-1]
+            outer.wall_time += total.wall_time
+            outer.cpu_time += total.cpu_time
+            outer.read_bytes += total.read_bytes
+            outer.written_bytes += total.written_bytes
+        record.wall_time = total.wall_time - inner.wall_time
+        record.cpu_time = total.cpu_time - inner.cpu_time
+        record.read_bytes = total.read_bytes - inner.read_bytes
+        record.written_bytes = total.written_bytes - inner.written_bytes
+        record.peak_rss_delta = cls._peak_rss() - peak_rss
+
+        with Path(cls.directory, f"{os.getpid()}.jsonl").open("a") as records_file:
+            records_file.write(json.dumps(asdict(record)) + "\n")
+
+    @classmethod
+    def iterate(cls, table: str, stage: str, frames: Iterable[T]) -> Iterator[T]:
+
+        # every frame drawn from the iterator is a call of the stage, the frame rows are its output rows
+        frames = iter(frames)
+        while True:
+            with cls.stage(table, stage) as record:
+                frame = next(frames, None)
+                record.rows_out = len(frame) if frame is not None else 0  # type: ignore
+            if frame is None:
+                return
+            yield frame
+
+    @staticmethod
+    def _aggregate(records: list[StageRecord]) -> list[StageRecord]:
+
+        # one row per table and stage, peaks are the largest of the calls and everything else is summed
+        stages: dict[tuple[str, str], StageRecord] = {}
+        for record in records:
+            key = (record.table, record.stage)
+            if key not in stages:
+                stages[key] = StageRecord(record.table, record.stage, calls=0)
+            total = stages[key]
+            total.rows_in += record.rows_in
+            total.rows_out += record.rows_out
+            total.calls += record.calls
+            total.wall_time += record.wall_time
+            total.cpu_time += record.cpu_time
+            total.peak_rss_delta = max(total.peak_rss_delta, record.peak_rss_delta)
+            total.read_bytes += record.read_bytes
+            total.written_bytes += record.written_bytes
+        return sorted(stages.values(), key=lambda total: (total.table, total.stage))
+
+    @classmethod
+    def report(cls, temp_directory: Path, started: datetime, wall_time: float) -> Path:
+
+        # a JSON report with the run and the stages, and the same stages as CSV next to it
+        if cls.directory is None:
+            error_message = "Profiling was not started"
+            raise cls.StageProfilerError(error_message)
+        try:
+            records = [StageRecord(**json.loads(line))
+                       for records_path in sorted(cls.directory.glob("*.jsonl"))
+                       for line in records_path.read_text().splitlines()]
+            stages = cls._aggregate(records)
+
+            report_path = Path(temp_directory, cls.directory_name, f"report-{started.strftime('%Y%m%d-%H%M%S')}.json")
+            report = {
+                "started": started.isoformat(timespec="seconds"),
+                "wall_time": wall_time,
+                "peak_rss": cls._peak_rss(),
+                "stages": [asdict(total) for total in stages],
+            }
+            report_path.write_text(json.dumps(report, indent=4))
+            with report_path.with_suffix(".csv").open("w", newline="") as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=[field.name for field in fields(StageRecord)])
+                writer.writeheader()
+                writer.writerows(asdict(total) for total in stages)
+
+        except Exception as e:
+            error_message = f"Error during writing of profiling report: {e}"
+            raise cls.StageProfilerError(error_message) from None
+
+        finally:
+            cls.stop()
+
+        return report_path
@@ -0,0 +1,397 @@
+import json
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from itertools import combinations
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+@dataclass
+class SyntheticPools:
+    titles: int
+    persons: int
+    words: pa.Array
+    first_names: pa.Array
+    last_names: pa.Array
+    jobs: pa.Array
+    attributes: pa.Array
+    genres: tuple[pa.Array, list[int]]
+    professions: tuple[pa.Array, list[int]]
+
+
+class SyntheticSources:
+    version: ClassVar[int] = 1
+    manifest_name: ClassVar[str] = "synthetic.json"
+    null_value: ClassVar[str] = "\\N"
+    # titles, or persons for name.basics, generated with one random generator and written at once
+    chunk_size: ClassVar[int] = 100_000
+    # rows of every file per row of title.principals, close to the proportions of the IMDb datasets
+    file_ratios: ClassVar[dict[str, float]] = {
+        "title.basics.tsv": 0.12,
+        "title.ratings.tsv": 0.016,
+        "title.episode.tsv": 0.09,
+        "title.akas.tsv": 0.55,
+        "title.principals.tsv": 1.0,
+        "name.basics.tsv": 0.15,
+    }
+    headers: ClassVar[dict[str, list[str]]] = {
+        "title.basics.tsv": ["tconst", "titleType", "primaryTitle", "originalTitle", "isAdult", "startYear",
+                             "endYear", "runtimeMinutes", "genres"],
+        "title.ratings.tsv": ["tconst", "averageRating", "numVotes"],
+        "title.episode.tsv": ["tconst", "parentTconst", "seasonNumber", "episodeNumber"],
+        "title.akas.tsv": ["titleId", "ordering", "title", "region", "language", "types", "attributes",
+                           "isOriginalTitle"],
+        "title.principals.tsv": ["tconst", "ordering", "nconst", "category", "job", "characters"],
+        "name.basics.tsv": ["nconst", "primaryName", "birthYear", "deathYear", "primaryProfession", "knownForTitles"],
+    }
+    title_types: ClassVar[dict[str, float]] = {
+        "tvEpisode": 0.72, "short": 0.095, "movie": 0.065, "video": 0.03, "tvSeries": 0.025, "tvMovie": 0.015,
+        "tvMiniSeries": 0.005, "tvSpecial": 0.005, "videoGame": 0.004, "tvShort": 0.0035, "tvPilot": 0.0025,
+    }
+    categories: ClassVar[dict[str, float]] = {
+        "actor": 0.27, "actress": 0.18, "self": 0.17, "writer": 0.09, "director": 0.08, "producer": 0.07,
+        "editor": 0.03, "cinematographer": 0.03, "composer": 0.03, "production_designer": 0.01,
+        "casting_director": 0.01, "archive_footage": 0.01,
+    }
+    # characters are only credited to these categories
+    character_categories: ClassVar[list[str]] = ["actor", "actress", "self", "archive_footage"]
+    frequent_characters: ClassVar[list[str]] = [
+        "Self", "Himself", "Herself", "Narrator", "Host", "Guest", "Various", "Dancer", "Contestant", "Presenter",
+        "Self - Host", "Self - Guest", "Singer", "Interviewee", "Performer", "Judge", "Announcer", "Reporter",
+    ]
+    genres: ClassVar[list[str]] = [
+        "Action", "Adult", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Documentary", "Drama", "Family",
+        "Fantasy", "Film-Noir", "Game-Show", "History", "Horror", "Music", "Musical", "Mystery", "News",
+        "Reality-TV", "Romance", "Sci-Fi", "Short", "Sport", "Talk-Show", "Thriller", "War", "Western",
+    ]
+    professions: ClassVar[list[str]] = [
+        "actor", "actress", "animation_department", "archive_footage", "art_department", "art_director",
+        "assistant", "assistant_director", "camera_department", "casting_department", "casting_director",
+        "cinematographer", "composer", "costume_department", "costume_designer", "director", "editor",
+        "editorial_department", "electrical_department", "executive", "legal", "location_management",
+        "make_up_department", "manager", "miscellaneous", "music_artist", "music_department", "podcaster",
+        "producer", "production_department", "production_designer", "production_manager", "publicist",
+        "script_department", "set_decorator", "sound_department", "soundtrack", "special_effects", "stunts",
+        "talent_agent", "transportation_department", "visual_effects", "writer",
+    ]
+    regions: ClassVar[list[str]] = [
+        "US", "GB", "DE", "FR", "IN", "CA", "JP", "ES", "IT", "BR", "AU", "MX", "RU", "SE", "NL", "AR", "PL",
+        "TR", "KR", "PT", "GR", "FI", "DK", "NO", "HU", "BE", "AT", "CH", "CZ", "RO", "XWW", "CN", "HK", "TW",
+        "IL", "IE", "EG", "PH", "ID", "SUHH", "XYU", "DDDE", "BG", "HR", "RS", "UA", "SI", "SK", "VE", "CO",
+    ]
+    languages: ClassVar[list[str]] = [
+        "en", "ja", "fr", "es", "de", "hi", "ru", "it", "pt", "tr", "sv", "bg", "nl", "cmn", "yue", "fa", "ca",
+        "ta", "te", "uk", "he", "ar", "qbn", "el", "sr", "pl", "hu", "cs", "ko", "th",
+    ]
+    aka_types: ClassVar[list[str]] = [
+        "imdbDisplay", "original", "alternative", "working", "festival", "dvd", "tv", "video",
+    ]
+    syllables: ClassVar[list[str]] = [
+        "ka", "lo", "mi", "ra", "te", "su", "ne", "vo", "da", "ri", "an", "el", "or", "us", "is", "en", "ba", "co",
+        "fi", "ge", "ho", "ju", "ly", "ma", "no", "pe", "qui", "sa", "to", "va", "wen", "xe", "ya", "zo", "ar",
+        "ber", "cal", "dor", "est", "fan", "gal", "har", "ion", "jor", "kin", "lan", "mon", "nor", "ost", "per",
+    ]
+
+    class SyntheticSourcesError(Exception):
+        pass
+
+    @staticmethod
+    def _skewed(rng: np.random.Generator, count: int, size: int, skew: float) -> np.ndarray:
+
+        # the lower indexes are drawn far more often, like the popular values of the IMDb columns
+        return (count * rng.random(size) ** skew).astype(np.int64)
+
+    @staticmethod
+    def _with_nulls(rng: np.random.Generator, array: pa.Array, rate: float) -> pa.Array:
+        return pc.if_else(pa.array(rng.random(len(array)) < rate), pa.scalar(None, array.type), array)
+
+    @staticmethod
+    def _text(values: np.ndarray, mask: np.ndarray | None = None) -> pa.Array:
+        return pc.cast(pa.array(values, mask=mask), pa.string())
+
+    @staticmethod
+    def _ids(prefix: str, numbers: np.ndarray) -> pa.Array:
+        return pc.binary_join_element_wise(prefix, pc.utf8_lpad(pc.cast(pa.array(numbers), pa.string()), 7, "0"), "")
+
+    @staticmethod
+    def _choice(rng: np.random.Generator, weights: dict[str, float], size: int) -> pa.Array:
+        p = np.array(list(weights.values()))
+        return pa.array(list(weights)).take(pa.array(rng.choice(len(p), size, p=p / p.sum())))
+
+    @classmethod
+    def _join_words(cls, rng: np.random.Generator, words: pa.Array, size: int, max_words: int) -> pa.Array:
+        counts = rng.integers(1, max_words + 1, size)
+        columns = [pc.if_else(pa.array(counts <= position), pa.scalar(None, pa.string()),
+                              words.take(pa.array(cls._skewed(rng, len(words), size, 2.0))))
+                   for position in range(max_words)]
+        return pc.binary_join_element_wise(*columns, " ", null_handling="skip")
+
+    @staticmethod
+    def _combinations(values: list[str], max_size: int) -> tuple[pa.Array, list[int]]:
+
+        # comma separated combinations, grouped by size, with the offsets of the groups
+        offsets: list[int] = [0]
+        joined: list[str] = []
+        for size in range(1, max_size + 1):
+            joined.extend(",".join(combination) for combination in combinations(values, size))
+            offsets.append(len(joined))
+        return pa.array(joined), offsets
+
+    @staticmethod
+    def _pick_combinations(rng: np.random.Generator, combos: tuple[pa.Array, list[int]], size_weights: list[float],
+                           size: int) -> pa.Array:
+        values, offsets = combos
+        sizes = rng.choice(len(size_weights), size, p=size_weights)
+        starts, counts = np.array(offsets[:-1])[sizes], np.diff(offsets)[sizes]
+        return values.take(pa.array(starts + (counts * rng.random(size)).astype(np.int64)))
+
+    @staticmethod
+    def _groups(rng: np.random.Generator, start: int, stop: int, mean: float) -> tuple[np.ndarray, np.ndarray]:
+
+        # a group of rows per title, sorted like the IMDb files, with the ordering of every row in its group
+        counts = rng.poisson(max(mean - 1, 0), stop - start) + 1
+        numbers = np.repeat(np.arange(start + 1, stop + 1), counts)
+        ordering = np.arange(len(numbers)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        return numbers, ordering
+
+    @classmethod
+    def _pools(cls, rng: np.random.Generator, rows: int) -> SyntheticPools:
+
+        def vocabulary(size: int) -> pa.Array:
+            syllables = pa.array(cls.syllables)
+            parts = [syllables.take(pa.array(rng.integers(0, len(cls.syllables), size))) for _ in range(3)]
+            short = pa.array(rng.random(size) < 0.5)
+            parts[2] = pc.if_else(short, pa.scalar(None, pa.string()), parts[2])
+            return pc.utf8_capitalize(pc.binary_join_element_wise(*parts, "", null_handling="skip"))
+
+        words = vocabulary(20_000)
+        return SyntheticPools(
+            titles=max(round(rows * cls.file_ratios["title.basics.tsv"]), 1),
+            persons=max(round(rows * cls.file_ratios["name.basics.tsv"]), 1),
+            words=words,
+            first_names=vocabulary(4_000),
+            last_names=vocabulary(30_000),
+            jobs=pc.utf8_lower(cls._join_words(rng, words, 3_000, 3)),
+            attributes=pc.binary_join_element_wise("(", cls._join_words(rng, words, 50, 2), ")", ""),
+            genres=cls._combinations(cls.genres, 3),
+            professions=cls._combinations(cls.professions, 3),
+        )
+
+    @classmethod
+    def _title_basics(cls, rng: np.random.Generator, pools: SyntheticPools, start: int, stop: int) -> list[pa.Array]:
+        size = stop - start
+        primary_title = cls._join_words(rng, pools.words, size, 5)
+        original_title = pc.if_else(pa.array(rng.random(size) < 0.9), primary_title,
+                                    cls._join_words(rng, pools.words, size, 5))
+        start_year = 2025 - (135 * rng.random(size) ** 2).astype(np.int64)
+        return [
+            cls._ids("tt", np.arange(start + 1, stop + 1)),
+            cls._choice(rng, cls.title_types, size),
+            primary_title,
+            original_title,
+            cls._text((rng.random(size) < 0.02).astype(np.int64)),
+            cls._text(start_year, rng.random(size) < 0.12),
+            cls._text(start_year + rng.integers(0, 15, size), rng.random(size) < 0.985),
+            cls._text(np.maximum(rng.gamma(2.0, 25.0, size).astype(np.int64), 1), rng.random(size) < 0.7),
+            cls._with_nulls(rng, cls._pick_combinations(rng, pools.genres, [0.5, 0.3, 0.2], size), 0.045),
+        ]
+
+    @classmethod
+    def _title_ratings(cls, rng: np.random.Generator, pools: SyntheticPools, start: int, stop: int) -> list[pa.Array]:
+        _ = pools
+        ratio = cls.file_ratios["title.ratings.tsv"] / cls.file_ratios["title.basics.tsv"]
+        numbers = np.arange(start + 1, stop + 1)[rng.random(stop - start) < ratio]
+        size = len(numbers)
+        rating = np.clip(rng.normal(69, 12, size), 10, 100).astype(np.int64)
+        return [
+            cls._ids("tt", numbers),
+            pc.binary_join_element_wise(cls._text(rating // 10), cls._text(rating % 10), "."),
+            cls._text(np.minimum(5 + rng.lognormal(3.0, 1.8, size), 3_000_000).astype(np.int64)),
+        ]
+
+    @classmethod
+    def _title_episode(cls, rng: np.random.Generator, pools: SyntheticPools, start: int, stop: int) -> list[pa.Array]:
+        ratio = cls.file_ratios["title.episode.tsv"] / cls.file_ratios["title.basics.tsv"]
+        numbers = np.arange(start + 1, stop + 1)[rng.random(stop - start) < ratio]
+        size = len(numbers)
+        unnumbered = rng.random(size) < 0.2
+        return [
+            cls._ids("tt", numbers),
+            cls._ids("tt", cls._skewed(rng, pools.titles, size, 3.0) + 1),
+            cls._text(rng.geometric(0.35, size), unnumbered),
+            cls._text(cls._skewed(rng, 200, size, 2.0) + 1, unnumbered),
+        ]
+
+    @classmethod
+    def _title_akas(cls, rng: np.random.Generator, pools: SyntheticPools, start: int, stop: int) -> list[pa.Array]:
+        mean = cls.file_ratios["title.akas.tsv"] / cls.file_ratios["title.basics.tsv"]
+        numbers, ordering = cls._groups(rng, start, stop, mean)
+        size = len(numbers)
+        return [
+            cls._ids("tt", numbers),
+            cls._text(ordering),
+            cls._join_words(rng, pools.words, size, 5),
+            cls._with_nulls(rng, pa.array(cls.regions).take(pa.array(cls._skewed(rng, len(cls.regions), size, 2.0))),
+                            0.15),
+            cls._with_nulls(rng, pa.array(cls.languages).take(
+                pa.array(cls._skewed(rng, len(cls.languages), size, 2.0))), 0.7),
+            cls._with_nulls(rng, pa.array(cls.aka_types).take(
+                pa.array(cls._skewed(rng, len(cls.aka_types), size, 2.0))), 0.55),
+            cls._with_nulls(rng, pools.attributes.take(pa.array(cls._skewed(rng, len(pools.attributes), size, 2.0))),
+                            0.97),
+            cls._text(((ordering == 1) & (rng.random(size) < 0.8)).astype(np.int64)),
+        ]
+
+    @classmethod
+    def _characters(cls, rng: np.random.Generator, pools: SyntheticPools, size: int) -> pa.Array:
+
+        def names() -> pa.Array:
+            first_names = pools.first_names.take(pa.array(cls._skewed(rng, len(pools.first_names), size, 2.0)))
+            last_names = pools.last_names.take(pa.array(cls._skewed(rng, len(pools.last_names), size, 2.0)))
+            frequent = pa.array(cls.frequent_characters).take(
+                pa.array(cls._skewed(rng, len(cls.frequent_characters), size, 2.0)))
+            return pc.if_else(pa.array(rng.random(size) < 0.35), frequent,
+                              pc.binary_join_element_wise(first_names, last_names, " "))
+
+        # JSON lists of one character, sometimes two, and now and then a name with escaped quotes
+        first, second = names(), names()
+        nickname = pc.binary_join_element_wise(
+            '\\"', pools.words.take(pa.array(rng.integers(0, len(pools.words), size))), '\\" ',
+            pools.last_names.take(pa.array(rng.integers(0, len(pools.last_names), size))), "")
+        first = pc.if_else(pa.array(rng.random(size) < 0.002), nickname, first)
+        second = pc.if_else(pa.array(rng.random(size) < 0.96), pa.scalar(None, pa.string()), second)
+        return pc.binary_join_element_wise(
+            '["', pc.binary_join_element_wise(first, second, '","', null_handling="skip"), '"]', "")
+
+    @classmethod
+    def _title_principals(cls, rng: np.random.Generator, pools: SyntheticPools, start: int,
+                          stop: int) -> list[pa.Array]:
+        mean = cls.file_ratios["title.principals.tsv"] / cls.file_ratios["title.basics.tsv"]
+        numbers, ordering = cls._groups(rng, start, stop, mean)
+        size = len(numbers)
+        category = cls._choice(rng, cls.categories, size)
+        credited = pc.is_in(category, pa.array(cls.character_categories))
+        uncredited = pc.or_(pc.invert(credited), pa.array(rng.random(size) < 0.05))
+        return [
+            cls._ids("tt", numbers),
+            cls._text(ordering),
+            cls._ids("nm", cls._skewed(rng, pools.persons, size, 2.0) + 1),
+            category,
+            cls._with_nulls(rng, pools.jobs.take(pa.array(cls._skewed(rng, len(pools.jobs), size, 3.0))), 0.82),
+            pc.if_else(uncredited, pa.scalar(None, pa.string()), cls._characters(rng, pools, size)),
+        ]
+
+    @classmethod
+    def _name_basics(cls, rng: np.random.Generator, pools: SyntheticPools, start: int, stop: int) -> list[pa.Array]:
+        size = stop - start
+        birth_year = 2010 - (160 * rng.random(size) ** 1.5).astype(np.int64)
+        death_year = birth_year + rng.integers(20, 95, size)
+        known_for = [pc.if_else(pa.array(rng.integers(1, 5, size) <= position), pa.scalar(None, pa.string()),
+                                cls._ids("tt", cls._skewed(rng, pools.titles, size, 2.0) + 1))
+                     if position else cls._ids("tt", cls._skewed(rng, pools.titles, size, 2.0) + 1)
+                     for position in range(4)]
+        return [
+            cls._ids("nm", np.arange(start + 1, stop + 1)),
+            pc.binary_join_element_wise(
+                pools.first_names.take(pa.array(cls._skewed(rng, len(pools.first_names), size, 2.0))),
+                pools.last_names.take(pa.array(cls._skewed(rng, len(pools.last_names), size, 1.5))), " "),
+            cls._text(birth_year, rng.random(size) < 0.95),
+            cls._text(death_year, (rng.random(size) < 0.98) | (death_year > 2025)),
+            cls._with_nulls(rng, cls._pick_combinations(rng, pools.professions, [0.55, 0.3, 0.15], size), 0.2),
+            cls._with_nulls(rng, pc.binary_join_element_wise(*known_for, ",", null_handling="skip"), 0.12),
+        ]
+
+    @classmethod
+    def _write_file(
+            cls,
+            file_path: Path,
+            header: list[str],
+            chunks: Iterator[list[pa.Array]],
+            compressed: bool,
+    ) -> int:
+
+        # the lines are joined by Arrow and their text buffer is written as is
+        rows = 0
+        sink = pa.CompressedOutputStream(str(file_path), "gzip") if compressed else pa.OSFile(str(file_path), "wb")
+        with sink:
+            sink.write(("\t".join(header) + "\n").encode())
+            for columns in chunks:
+                if not len(columns[0]):
+                    continue
+                lines = pc.binary_join_element_wise(*columns, "\t", null_handling="replace",
+                                                    null_replacement=cls.null_value)
+                lines = pc.binary_join_element_wise(lines, "\n", "")
+                offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32)[lines.offset:lines.offset + len(lines) + 1]
+                sink.write(lines.buffers()[2].slice(offsets[0], offsets[-1] - offsets[0]))
+                rows += len(lines)
+        return rows
+
+    @classmethod
+    def _chunks(  # noqa: PLR0913
+            cls,
+            generate: Callable[[np.random.Generator, SyntheticPools, int, int], list[pa.Array]],
+            pools: SyntheticPools,
+            seed: int,
+            file_index: int,
+            count: int,
+    ) -> Iterator[list[pa.Array]]:
+
+        # a generator per chunk seeded from its position, so every chunk is reproducible on its own
+        for chunk_index, start in enumerate(range(0, count, cls.chunk_size)):
+            rng = np.random.default_rng([seed, file_index, chunk_index])
+            yield generate(rng, pools, start, min(start + cls.chunk_size, count))
+
+    @classmethod
+    def _manifest(cls, rows: int, seed: int, compressed: bool) -> dict:
+        return {"version": cls.version, "rows": rows, "seed": seed, "compressed": compressed}
+
+    @classmethod
+    def load_manifest(cls, directory: Path) -> dict:
+        manifest_path = Path(directory, cls.manifest_name)
+        return json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    @classmethod
+    def generate(cls, directory: Path, rows: int, seed: int = 42, compressed: bool = False) -> dict[str, int]:
+
+        # the IMDb files at a scale of `rows` rows of title.principals, kept while scale and seed stay the same
+        manifest = cls.load_manifest(directory)
+        if {key: manifest.get(key) for key in ("version", "rows", "seed", "compressed")} == cls._manifest(
+                rows, seed, compressed):
+            print(f"Synthetic sources in {directory} are up to date.", flush=True)
+            return manifest["files"]
+
+        try:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            Path(directory, cls.manifest_name).unlink(missing_ok=True)
+            pools = cls._pools(np.random.default_rng([seed]), rows)
+            generators = {
+                "title.basics.tsv": (cls._title_basics, pools.titles),
+                "title.ratings.tsv": (cls._title_ratings, pools.titles),
+                "title.episode.tsv": (cls._title_episode, pools.titles),
+                "title.akas.tsv": (cls._title_akas, pools.titles),
+                "title.principals.tsv": (cls._title_principals, pools.titles),
+                "name.basics.tsv": (cls._name_basics, pools.persons),
+            }
+            files = {}
+            for file_index, (file_name, (generate, count)) in enumerate(generators.items()):
+                print(f"Generating synthetic file: {file_name}", flush=True)
+
+                # the other variant of the file would be read in place of this one
+                file_path = Path(directory, f"{file_name}.gz" if compressed else file_name)
+                Path(directory, file_name if compressed else f"{file_name}.gz").unlink(missing_ok=True)
+                files[file_name] = cls._write_file(file_path, cls.headers[file_name],
+                                                   cls._chunks(generate, pools, seed, file_index, count), compressed)
+                print(f"Generated {files[file_name]:,} rows of {file_name}", flush=True)
+
+            Path(directory, cls.manifest_name).write_text(
+                json.dumps({**cls._manifest(rows, seed, compressed), "files": files}, indent=4))
+
+        except Exception as e:
+            error_message = f"Error during generation of synthetic sources: {e}"
+            raise cls.SyntheticSourcesError(error_message) from None
+
+        return files
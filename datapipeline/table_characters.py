@@ -1,70 +1,30 @@
-import numpy as np
+from typing import ClassVar
+
 import pandas as pd
-from pathlib import Path
 
-from .abstract_table import AbstractTable
+from .dimension_table import DimensionTable
 
 
-class Characters(AbstractTable):
+class Characters(DimensionTable):
+    batch_columns: ClassVar[list[str]] = ["characters"]
+    dimension_source: ClassVar[str] = "title.principals.tsv"
+    debug_slice: ClassVar[bool] = False
 
     @classmethod
-    def _process_batch(cls, file_name: str, file_suffix: str, nrows: int, skiprows: int,  # noqa: PLR0913
-                       df2: None) -> None:
-
-        _ = df2
-
-        print(f"Processing: {file_name}_{file_suffix}, {nrows:n}:{skiprows:n}")
-
-        try:
-            # read title.principals.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=[5],
-                nrows=nrows,
-                skiprows=skiprows,
-            )
-            df.columns = ["characters"]
-
-        except (FileNotFoundError, Exception) as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.FileProcessingError(error_message) from None
-
-        try:
+    def distinct_values(cls, df: pd.DataFrame) -> pd.Series:
 
-            df = (
-                df
-                .assign(
-                    character=df["characters"].apply(
-                        lambda json_str: json_str.replace("[\"", "")
-                        .replace("\"]", "") if isinstance(json_str, str) else json_str)
-                    .str.split(","),
-                )
-                .explode("character")
-                .replace({"\\N": np.nan})  # fix null values
-                .dropna(subset=["character"], how="all")
-                .assign(
-                    id=lambda x: x["character"].apply(lambda x: cls._generate_id(x)).astype(str),
-                )
-                .drop("characters", axis=1)
-                .reindex(columns=["id", "character"])
-                .drop_duplicates(subset=["id", "character"])
-                .sort_values(by=["character"])
-                .reset_index(drop=True)
-            )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
-
-        cls._save_to_parquet(df, file_suffix)
-        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
+        # principals share few distinct character lists, every list is parsed once
+        s = pd.Series(df["characters"].dropna().unique())
+        return cls._unnest(s.to_frame(), "character", cls._parse_json_lists(s))["character"]
 
     @classmethod
-    def process_table(cls, file_name: str, second_file_name: str | None) -> None:
-
-        _ = second_file_name
-
-        print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
-
-        cls._process_batches(file_name, None, cls._process_batch)
+    def _dimension_frame(cls, values: pd.Series) -> pd.DataFrame:
+        return (
+            pd.DataFrame({"character": values})
+            .assign(
+                id=lambda x: cls._generate_interned_ids(x["character"]).astype(str),
+            )
+            .reindex(columns=["id", "character"])
+            .sort_values(by=["character"])
+            .reset_index(drop=True)
+        )
@@ -1,53 +1,27 @@
-import numpy as np
-import pandas as pd
-from pathlib import Path
-
-from .abstract_table import AbstractTable
-
+from typing import ClassVar
 
-class Jobs(AbstractTable):
-    @classmethod
-    def process_table(cls, file_name: str, second_file_name: str | None) -> None:
+import pandas as pd
 
-        _ = second_file_name
+from .dimension_table import DimensionTable
 
-        print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
 
-        try:
-            # read title.principals.tsv - only column jobs into Pandas series, filter unique values and create dataframe
-            s = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=["job"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )["job"]
-            s = s.unique()
-            df = pd.DataFrame({"job": s})
+class Jobs(DimensionTable):
+    batch_columns: ClassVar[list[str]] = ["job"]
+    dimension_source: ClassVar[str] = "title.principals.tsv"
 
-        except (FileNotFoundError, Exception) as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.FileProcessingError(error_message) from None
+    @classmethod
+    def _dimension_frame(cls, values: pd.Series) -> pd.DataFrame:
 
-        try:
+        df = pd.DataFrame({"job": values.astype(cls.string_dtype)})
 
-            df = (
-                df
-                .replace({"\\N": np.nan})
-                .dropna(subset=["job"], how="all")
-                .assign(
-                    id=df["job"].apply(lambda x: cls._generate_id(x) if x is not None else None),
-                    job=df["job"].str.slice(0, 36).str.title().str.replace("_", " "),
-                )
-                .reindex(columns=["id", "job"])
-                .drop_duplicates(subset=["id", "job"])
-                .sort_values(by=["job"])
-                .reset_index(drop=True)
+        return (
+            df
+            .assign(
+                id=cls._generate_interned_ids(df["job"]),
+                job=df["job"].str.slice(0, 36).str.title().str.replace("_", " "),
             )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
-
-        cls._save_to_parquet(df)
-
-        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
+            .reindex(columns=["id", "job"])
+            .drop_duplicates(subset=["id", "job"])
+            .sort_values(by=["job"])
+            .reset_index(drop=True)
+        )
@@ -1,65 +1,76 @@
-import numpy as np
+from typing import TYPE_CHECKING, ClassVar
+
 import pandas as pd
-from pathlib import Path
 
 from .abstract_table import AbstractTable
+from .parquet_profile import ParquetProfile
+from .stage_profiler import StageProfiler
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 
 class Names(AbstractTable):
+    source_columns: ClassVar[dict[str, list[str]]] = {
+        "title.akas.tsv": ["titleId", "ordering", "title", "region", "language", "isOriginalTitle"],
+    }
+    title_index: ClassVar[str | None] = "title.basics.tsv"
+    delta_key: ClassVar[str | None] = "id"
+    output_order: ClassVar[str | None] = "name"
+    parquet_profile: ClassVar[ParquetProfile] = ParquetProfile(sorting_columns=("name",))
+
+    @classmethod
+    def _filter_titles(cls, title_akas: pd.DataFrame) -> pd.DataFrame:
+
+        with StageProfiler.stage(cls.__name__, "transform", title_akas.shape[0]) as stage:
+            try:
+
+                # keep the akas of titles in title.basics.tsv
+                df = (
+                    title_akas[cls._in_title_index(title_akas["titleId"])]
+                    .rename(columns={"titleId": "id", "title": "name", "isOriginalTitle": "is_original_title"})
+                    .dropna(subset=["id"], how="all")
+                    .astype({
+                        "id": cls._id_dtype(),
+                        "ordering": int,
+                        "name": cls.string_dtype,
+                        "is_original_title": bool,
+                    })
+                )
+
+            except Exception as e:
+                error_message = f"File title.akas.tsv not found: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
+
+        return df
+
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
         print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
 
+        if second_file_name is None:
+            error_message = f"Table {cls.__name__} needs a second file besides {file_name}"
+            raise cls.FileProcessingError(error_message)
+
         try:
-            # read title.basics.tsv as dataframe - only column tconst
-            title_basics = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                low_memory=False,
-                usecols=["tconst"],
-            )
-
-            # read title.akas.tsv as dataframe
-            title_akas = pd.read_csv(
-                Path(cls.temp_directory, second_file_name),  # type: ignore
-                sep="\t", low_memory=False,
-                usecols=["titleId", "ordering", "title", "region", "language", "isOriginalTitle"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )
+            # read title.akas.tsv as dataframe, unless it is streamed batch by batch into the out of core sort
+            columns = cls.source_columns[second_file_name]
+            if not cls.sort_memory_limit:
+                title_akas = cls._read_source(second_file_name, columns)
 
         except (FileNotFoundError, Exception) as e:
             error_message = f"File {file_name} not found: {e}"
             raise cls.FileProcessingError(error_message) from None
 
-        # inner join
-        df = pd.merge(title_basics, title_akas, left_on="tconst", right_on="titleId", how="inner")  # noqa: PD015
-        del title_basics, title_akas
-
-        try:
-
-            df = (
-                df
-                .replace({"\\N": np.nan})
-                .drop("titleId", axis=1)
-                .rename(columns={"tconst": "id", "title": "name", "isOriginalTitle": "is_original_title"})
-                .sort_values(by=["name"])
-                .dropna(subset=["id"], how="all")
-                .drop_duplicates(subset=["id", "ordering"])
-                .reset_index(drop=True)
-                .astype({
-                    "id": str,
-                    "ordering": int,
-                    "name": str,
-                    "region": str,
-                    "language": str,
-                    "is_original_title": bool,
-                })
-            )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
+        frames: "Iterable[pd.DataFrame]"
+        if cls.sort_memory_limit:
+            frames = (cls._filter_titles(title_akas)
+                      for title_akas in cls._iter_source(second_file_name, columns))
+        else:
+            frames = [cls._filter_titles(title_akas)]
+            del title_akas
 
-        cls._save_to_parquet(df)
+        cls._sort_deduplicate_and_save(frames, ["id", "ordering"])
         print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
@@ -1,11 +1,17 @@
-import numpy as np
+from typing import ClassVar
+
 import pandas as pd
-from pathlib import Path
 
 from .abstract_table import AbstractTable
+from .stage_profiler import StageProfiler
 
 
 class Persons(AbstractTable):
+    source_columns: ClassVar[dict[str, list[str]]] = {
+        "name.basics.tsv": ["nconst", "primaryName", "birthYear", "deathYear"],
+    }
+    delta_key: ClassVar[str | None] = "id"
+
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
@@ -15,31 +21,32 @@ class Persons(AbstractTable):
 
         try:
             # read name.basics.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=["nconst", "primaryName", "birthYear", "deathYear"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )
+            df = cls._read_source(file_name, ["nconst", "primaryName", "birthYear", "deathYear"])
 
         except (FileNotFoundError, Exception) as e:
             error_message = f"File {file_name} not found: {e}"
             raise cls.FileProcessingError(error_message) from None
 
-        try:
-
-            df = (
-                df
-                .replace({"\\N": np.nan})
-                .rename(columns={"nconst": "id", "primaryName": "full_name", "birthYear": "birth_year",
-                                 "deathYear": "death_year"})
-                .drop_duplicates(subset=["id", "full_name", "birth_year", "death_year"])
-                .astype({"id": str, "full_name": str, "birth_year": pd.Int64Dtype(), "death_year": pd.Int64Dtype()})
-            )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
+        with StageProfiler.stage(cls.__name__, "transform", df.shape[0]) as stage:
+            try:
+
+                df = (
+                    df
+                    .rename(columns={"nconst": "id", "primaryName": "full_name", "birthYear": "birth_year",
+                                     "deathYear": "death_year"})
+                    .drop_duplicates(subset=["id", "full_name", "birth_year", "death_year"])
+                    .astype({
+                        "id": cls._id_dtype(),
+                        "full_name": cls.string_dtype,
+                        "birth_year": pd.Int64Dtype(),
+                        "death_year": pd.Int64Dtype(),
+                    })
+                )
+
+            except Exception as e:
+                error_message = f"File {file_name} not found: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
 
         cls._save_to_parquet(df)
         print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
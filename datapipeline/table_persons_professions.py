@@ -1,11 +1,17 @@
-import numpy as np
-import pandas as pd
-from pathlib import Path
+from typing import ClassVar
+
 
 from .abstract_table import AbstractTable
+from .dimension_table import DimensionTable
+from .stage_profiler import StageProfiler
+from .table_professions import Professions
 
 
 class PersonsProfessions(AbstractTable):
+    source_columns: ClassVar[dict[str, list[str]]] = {"name.basics.tsv": ["nconst", "primaryProfession"]}
+    delta_key: ClassVar[str | None] = "id"
+    dimensions: ClassVar[list[type[DimensionTable]]] = [Professions]
+
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
@@ -15,39 +21,29 @@ class PersonsProfessions(AbstractTable):
 
         try:
             # read name.basics.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=["nconst", "primaryProfession"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )
+            df = cls._read_source(file_name, ["nconst", "primaryProfession"])
 
         except (FileNotFoundError, Exception) as e:
             error_message = f"File {file_name} not found: {e}"
             raise cls.FileProcessingError(error_message) from None
 
-        try:
-
-            df = (
-                df
-                .replace({"\\N": np.nan})
-                .rename(columns={"nconst": "id", "primaryProfession": "professions"})
-                .assign(
-                    profession=lambda x: x["professions"].str.split(","),
-                )
-                .explode("profession")
-                .drop("professions", axis=1)
-                .drop_duplicates(subset=["id", "profession"])
-                .dropna(subset=["profession"], how="all")
-                .assign(
-                    profession_id=lambda x: x["profession"].apply(lambda x: cls._generate_id(x)).astype(str),
+        with StageProfiler.stage(cls.__name__, "transform", df.shape[0]) as stage:
+            try:
+
+                df = cls._unnest(df, "profession", *cls._split_values(df["primaryProfession"]), key_column="nconst")
+                df = (
+                    df
+                    .rename(columns={"nconst": "id"})
+                    .assign(
+                        profession_id=lambda x: cls._generate_interned_ids(x["profession"]),
+                    )
+                    .drop("profession", axis=1)
                 )
-                .drop("profession", axis=1)
-            )
 
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
+            except Exception as e:
+                error_message = f"File {file_name} not found: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
 
         cls._save_to_parquet(df)
         print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
@@ -1,34 +1,23 @@
-import numpy as np
+from typing import ClassVar
+
 import pandas as pd
-from pathlib import Path
 
 from .abstract_table import AbstractTable
+from .dimension_table import DimensionTable
+from .parquet_profile import ParquetProfile
+from .table_categories import Categories
+from .table_jobs import Jobs
 
 
 class Principals(AbstractTable):
+    batch_columns: ClassVar[list[str]] = ["tconst", "ordering", "nconst", "category", "job"]
+    delta_key: ClassVar[str | None] = "title_id"
+    dimensions: ClassVar[list[type[DimensionTable]]] = [Categories, Jobs]
+    parquet_profile: ClassVar[ParquetProfile] = ParquetProfile(partition_columns=("category_id",),
+                                                                 max_rows_per_file=10_000_000)
 
     @classmethod
-    def _process_batch(cls, file_name: str, file_suffix: str, nrows: int, skiprows: int,  # noqa: PLR0913
-                       df2: pd.DataFrame) -> None:
-
-        _ = df2
-
-        print(f"Processing: {file_name}_{file_suffix}, {nrows:n}:{skiprows:n}")
-
-        try:
-            # read title.principals.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=[0, 1, 2, 3, 4],
-                nrows=nrows,
-                skiprows=skiprows,
-            )
-            df.columns = ["tconst", "ordering", "nconst", "category", "job"]
-
-        except (FileNotFoundError, Exception) as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.FileProcessingError(error_message) from None
+    def _process_batch(cls, file_name: str, df: pd.DataFrame) -> pd.DataFrame:
 
         try:
 
@@ -36,22 +25,19 @@ class Principals(AbstractTable):
                 df
                 .assign(
                     job=df["job"].str.slice(0, 36).str.title().str.replace("_", " "),
-                    id=df.apply(lambda row: cls._generate_synthetic_id(row), axis=1),
-                    category_id=df["category"].apply(lambda x: cls._generate_id(x) if x is not None else None),
-                    job_id=df["job"].apply(lambda x: cls._generate_id(x) if x is not None else None),
+                    id=cls._generate_synthetic_ids(df),
+                    category_id=cls._generate_interned_ids(df["category"]),
+                    job_id=cls._generate_interned_ids(df["job"]),
                 )
-                .replace({"\\N": np.nan})
                 .rename(columns={"tconst": "title_id", "nconst": "person_id"})
                 .reindex(columns=["id", "title_id", "ordering", "person_id", "category_id",
                                   "job_id"])
                 .drop_duplicates(subset=["id"])
                 .astype({
-                    "id": str,
-                    "title_id": str,
+                    "id": cls.string_dtype,
+                    "title_id": cls._id_dtype(),
                     "ordering": int,
-                    "person_id": str,
-                    "category_id": str,
-                    "job_id": str,
+                    "person_id": cls._id_dtype(),
                 })
             )
 
@@ -59,12 +45,14 @@ class Principals(AbstractTable):
             error_message = f"File {file_name} not found: {e}"
             raise cls.DataTransformationError(error_message) from None
 
-        cls._save_to_parquet(df, file_suffix)
-        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
+        return df
 
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
         print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
 
-        cls._process_batches(file_name, second_file_name, cls._process_batch)
+        _ = second_file_name
+
+        cls._save_batches_to_parquet(cls._process_batches(file_name, cls._process_batch))
+        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
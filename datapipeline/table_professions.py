@@ -1,55 +1,27 @@
-import numpy as np
-import pandas as pd
-from pathlib import Path
-
-from .abstract_table import AbstractTable
-
+from typing import ClassVar
 
-class Professions(AbstractTable):
-    @classmethod
-    def process_table(cls, file_name: str, second_file_name: str | None) -> None:
+import pandas as pd
 
-        _ = second_file_name
+from .dimension_table import DimensionTable
 
-        print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
 
-        try:
-            # read name.basics.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=["primaryProfession"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )
+class Professions(DimensionTable):
+    batch_columns: ClassVar[list[str]] = ["primaryProfession"]
+    dimension_source: ClassVar[str] = "name.basics.tsv"
 
-        except (FileNotFoundError, Exception) as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.FileProcessingError(error_message) from None
-
-        try:
+    @classmethod
+    def distinct_values(cls, df: pd.DataFrame) -> pd.Series:
+        return cls._unnest(df, "profession", *cls._split_values(df["primaryProfession"]))["profession"]
 
-            df = (
-                df
-                .replace({"\\N": np.nan})
-                .assign(
-                    profession=lambda x: x["primaryProfession"].str.split(","),
-                )
-                .explode("profession")
-                .drop("primaryProfession", axis=1)
-                .drop_duplicates(subset=["profession"])
-                .dropna(subset=["profession"], how="all")
-                .assign(
-                    id=lambda x: x["profession"].apply(lambda x: cls._generate_id(x)).astype(str),
-                    profession=lambda x: x["profession"].str.title().str.replace("_", " "),
-                )
-                .reindex(columns=["id", "profession"])
-                .sort_values(by=["profession"])
-                .reset_index(drop=True)
+    @classmethod
+    def _dimension_frame(cls, values: pd.Series) -> pd.DataFrame:
+        return (
+            pd.DataFrame({"profession": values})
+            .assign(
+                id=lambda x: cls._generate_interned_ids(x["profession"]).astype(str),
+                profession=lambda x: x["profession"].astype(str).str.title().str.replace("_", " "),
             )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
-
-        cls._save_to_parquet(df)
-        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
+            .reindex(columns=["id", "profession"])
+            .sort_values(by=["profession"])
+            .reset_index(drop=True)
+        )
@@ -0,0 +1,156 @@
+import gzip
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar
+
+from .abstract_table import AbstractTable
+from .source_cache import SourceCache
+from .source_reader import SourceReader
+from .title_index import TitleIndex
+
+
+@dataclass
+class TableJob:
+    name: str
+    function: Callable
+    arguments: tuple
+    memory: int
+    dependencies: set[str] = field(default_factory=set)
+
+
+class TableScheduler:
+    # pandas frames take several times the size of the TSV text they were parsed from
+    memory_factor: ClassVar[int] = 5
+    # and the TSV text takes several times the size of its .tsv.gz archive
+    compression_ratio: ClassVar[int] = 5
+    # bytes read from the start of a source to measure the width of its lines
+    sample_size: ClassVar[int] = 1024 * 1024
+
+    class TableSchedulerError(Exception):
+        pass
+
+    @classmethod
+    def _estimate_memory(cls, temp_directory: Path, file_names: list[str]) -> int:
+        size = 0
+        for file_name in file_names:
+            file_path = SourceReader.source_path(temp_directory, file_name)
+            if file_path.exists():
+                ratio = cls.compression_ratio if file_path.suffix == ".gz" else 1
+                size += ratio * file_path.stat().st_size
+        return cls.memory_factor * size
+
+    @classmethod
+    def _row_width(cls, temp_directory: Path, file_name: str) -> int:
+        file_path = SourceReader.source_path(temp_directory, file_name)
+        if not file_path.exists():
+            return 0
+        with gzip.open(file_path) if file_path.suffix == ".gz" else file_path.open("rb") as source_file:
+            sample = source_file.read(cls.sample_size)
+        return len(sample) // max(sample.count(b"\n"), 1)
+
+    @classmethod
+    def _estimate_batch_memory(cls, temp_directory: Path, file_name: str) -> int:
+
+        # a batched table streams its source, the reader keeps up to two batches per worker ahead of the workers
+        batches = 2 * AbstractTable.batch_workers + 1 if AbstractTable.batch_workers > 1 else 1
+        in_flight = cls.memory_factor * cls._row_width(temp_directory, file_name) * batches * AbstractTable.batch_size
+        return min(cls._estimate_memory(temp_directory, [file_name]), in_flight)
+
+    @classmethod
+    def build_jobs(
+            cls,
+            temp_directory: Path,
+            tables: list[tuple[type[AbstractTable], str, str | None]],
+    ) -> list[TableJob]:
+
+        consumers: dict[str, list[type[AbstractTable]]] = {}
+        for table, _, _ in tables:
+            for file_name in table.source_columns:
+                consumers.setdefault(file_name, []).append(table)
+
+        # a source read by more than one table is parsed once by its own job, the tables depend on that job;
+        # in debug mode only the rows the tables read are parsed
+        nrows = AbstractTable.row_limit_size if AbstractTable.debug else None
+        jobs = []
+        for file_name, file_consumers in consumers.items():
+            if len(file_consumers) > 1:
+                columns = sorted({column for table in file_consumers for column in table.source_columns[file_name]})
+                jobs.append(TableJob(
+                    name=file_name,
+                    function=SourceCache.spill,
+                    arguments=(temp_directory, file_name, columns, nrows),
+                    memory=cls._estimate_memory(temp_directory, [file_name]),
+                ))
+
+        # the tconst index is built once by its own job as well, from the spilled source when there is one
+        title_indexes = sorted({table.title_index for table, _, _ in tables if table.title_index is not None})
+        jobs.extend(TableJob(
+            name=f"{file_name} index",
+            function=TitleIndex.build,
+            arguments=(temp_directory, file_name),
+            memory=cls._estimate_memory(temp_directory, [file_name]) // cls.memory_factor,
+            dependencies={file_name} if len(consumers.get(file_name, [])) > 1 else set(),
+        ) for file_name in title_indexes)
+
+        for table, file_name, second_file_name in tables:
+            dependencies = {source for source in table.source_columns if len(consumers[source]) > 1}
+            if table.title_index is not None:
+                dependencies.add(f"{table.title_index} index")
+            jobs.append(TableJob(
+                name=table.__name__,
+                function=table.process,
+                arguments=(file_name, second_file_name),
+                memory=cls._estimate_memory(temp_directory, list(table.source_columns))
+                + (cls._estimate_batch_memory(temp_directory, file_name) if table.batch_columns else 0),
+                dependencies=dependencies,
+            ))
+
+        return jobs
+
+    @classmethod
+    def _next_job(cls, pending: list[TableJob], running: dict[Future, TableJob], finished: set[str],
+                  memory_budget: int) -> TableJob | None:
+
+        used_memory = sum(job.memory for job in running.values())
+        for job in pending:
+            if not job.dependencies.issubset(finished):
+                continue
+            # a single job larger than the budget still runs, but only on its own
+            if running and memory_budget and used_memory + job.memory > memory_budget:
+                continue
+            return job
+        return None
+
+    @classmethod
+    def run(  # noqa: PLR0913
+            cls,
+            jobs: list[TableJob],
+            max_workers: int,
+            memory_budget: int,
+            initializer: Callable,
+            initargs: tuple[Any, ...],
+    ) -> None:
+
+        pending = list(jobs)
+        running: dict[Future, TableJob] = {}
+        finished: set[str] = set()
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+            while pending or running:
+
+                while len(running) < max_workers and (job := cls._next_job(pending, running, finished, memory_budget)):
+                    print(f"Scheduling job: {job.name}, estimated memory: {job.memory:n} B", flush=True)
+                    pending.remove(job)
+                    running[executor.submit(job.function, *job.arguments)] = job
+
+                if not running:
+                    error_message = f"Unresolved dependencies of jobs: {[job.name for job in pending]}"
+                    raise cls.TableSchedulerError(error_message)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    future.result()
+                    finished.add(job.name)
@@ -1,95 +1,108 @@
-import numpy as np
+from typing import ClassVar
+
 import pandas as pd
-from pathlib import Path
 
 from .abstract_table import AbstractTable
+from .dimension_table import DimensionTable
+from .parquet_profile import ParquetProfile
+from .stage_profiler import StageProfiler
+from .table_types import Types
 
 
 class Titles(AbstractTable):
     csv = None
+    source_columns: ClassVar[dict[str, list[str]]] = {
+        "title.basics.tsv": ["tconst", "titleType", "primaryTitle", "originalTitle", "isAdult", "startYear",
+                             "endYear", "runtimeMinutes", "genres"],
+        "title.ratings.tsv": ["tconst", "averageRating", "numVotes"],
+    }
+    delta_key: ClassVar[str | None] = "id"
+    dimensions: ClassVar[list[type[DimensionTable]]] = [Types]
+    output_order: ClassVar[str | None] = "name"
+    parquet_profile: ClassVar[ParquetProfile] = ParquetProfile(sorting_columns=("name",),
+                                                                 partition_columns=("start_year",))
 
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
         print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
 
+        if second_file_name is None:
+            error_message = f"Table {cls.__name__} needs a second file besides {file_name}"
+            raise cls.FileProcessingError(error_message)
+
         try:
             # read title.basics.tsv as dataframe
-            cls.csv = pd.read_csv(Path(cls.temp_directory, file_name), sep="\t", low_memory=False,
-                                  nrows=cls.row_limit_size if cls.debug else None)
+            cls.csv = cls._read_source(file_name, cls.source_columns[file_name])
             title_basics = cls.csv
 
             # read title.ratings.tsv as dataframe
-            title_ratings = pd.read_csv(
-                Path(cls.temp_directory, second_file_name),  # type: ignore
-                sep="\t",
-                low_memory=False,
+            title_ratings = cls._read_source(
+                second_file_name,
+                cls.source_columns[second_file_name],
+                limit_rows=False,
             )
 
         except (FileNotFoundError, Exception) as e:
             error_message = f"File {file_name} not found: {e}"
             raise cls.FileProcessingError(error_message) from None
 
-        try:
+        with StageProfiler.stage(cls.__name__, "transform", title_basics.shape[0]) as stage:
+            try:
 
-            # left join
-            df = pd.merge(title_basics, title_ratings, on="tconst", how="left")  # noqa: PD015
-            del title_basics, title_ratings
+                # left join
+                df = pd.merge(title_basics, title_ratings, on="tconst", how="left")  # noqa: PD015
+                del title_basics, title_ratings
 
-            df = (
-                df
-                .drop(columns=["originalTitle"])
-                .replace({"\\N": np.nan})
-                .assign(
-                    runtime_minutes=pd.to_numeric(df["runtimeMinutes"], errors="coerce").astype("Int64"),
-                    type_id=df["titleType"].apply(lambda x: cls._generate_id(x) if x is not None else None),
-                    genre_id=df["genres"].apply(lambda x: cls._generate_id(x) if x is not None else None),
+                df = (
+                    df
+                    .drop(columns=["originalTitle"])
+                    .assign(
+                        runtime_minutes=pd.to_numeric(df["runtimeMinutes"], errors="coerce").astype("Int64"),
+                        type_id=cls._generate_interned_ids(df["titleType"]),
+                        genre_id=cls._generate_interned_ids(df["genres"]),
+                    )
+                    .drop(columns=["runtimeMinutes", "titleType", "genres"], axis=1)
+                    .reset_index()
+                    .rename(columns={
+                        "tconst": "id",
+                        "primaryTitle": "name",
+                        "isAdult": "is_adult",
+                        "startYear": "start_year",
+                        "endYear": "end_year",
+                        "runtimeMinutes": "runtime_minutes",
+                        "averageRating": "average_rating",
+                        "numVotes": "number_of_votes",
+                    })
+                    .reindex(
+                        columns=[
+                            "id",
+                            "name",
+                            "type_id",
+                            "genre_id",
+                            "is_adult",
+                            "start_year",
+                            "end_year",
+                            "average_rating",
+                            "number_of_votes",
+                            "runtime_minutes",
+                        ])
+                    .astype({
+                        "id": cls._id_dtype(),
+                        "name": cls.string_dtype,
+                        "is_adult": bool,
+                        "start_year": pd.Int64Dtype(),
+                        "end_year": pd.Int64Dtype(),
+                        "average_rating": float,
+                        "number_of_votes": pd.Int64Dtype(),
+                        "runtime_minutes": pd.Int64Dtype(),
+                    })
                 )
-                .drop(columns=["runtimeMinutes", "titleType", "genres"], axis=1)
-                .reset_index()
-                .rename(columns={
-                    "tconst": "id",
-                    "primaryTitle": "name",
-                    "isAdult": "is_adult",
-                    "startYear": "start_year",
-                    "endYear": "end_year",
-                    "runtimeMinutes": "runtime_minutes",
-                    "averageRating": "average_rating",
-                    "numVotes": "number_of_votes",
-                })
-                .reindex(
-                    columns=[
-                        "id",
-                        "name",
-                        "type_id",
-                        "genre_id",
-                        "is_adult",
-                        "start_year",
-                        "end_year",
-                        "average_rating",
-                        "number_of_votes",
-                        "runtime_minutes",
-                    ])
-                .sort_values(by=["name"])
-                .drop_duplicates(subset=["id"])
-                .reset_index(drop=True)
-                .astype({
-                    "id": str,
-                    "name": str,
-                    "type_id": str,
-                    "genre_id": str,
-                    "is_adult": bool,
-                    "start_year": pd.Int64Dtype(),
-                    "end_year": pd.Int64Dtype(),
-                    "average_rating": float,
-                    "number_of_votes": pd.Int64Dtype(),
-                    "runtime_minutes": pd.Int64Dtype(),
-                })
-            )
 
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
+            except Exception as e:
+                error_message = f"File {file_name} not found: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
 
-        cls._save_to_parquet(df)
+        cls._sort_deduplicate_and_save([df], ["id"])
         print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
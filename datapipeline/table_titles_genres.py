@@ -1,10 +1,16 @@
-import pandas as pd
-from pathlib import Path
+from typing import ClassVar
 
 from .abstract_table import AbstractTable
+from .dimension_table import DimensionTable
+from .stage_profiler import StageProfiler
+from .table_genres import Genres
 
 
 class TitlesGenres(AbstractTable):
+    source_columns: ClassVar[dict[str, list[str]]] = {"title.basics.tsv": ["tconst", "genres"]}
+    delta_key: ClassVar[str | None] = "id"
+    dimensions: ClassVar[list[type[DimensionTable]]] = [Genres]
+
     @classmethod
     def process_table(cls, file_name: str, second_file_name: str | None) -> None:
 
@@ -14,43 +20,29 @@ class TitlesGenres(AbstractTable):
 
         try:
             # read title.basics.tsv as dataframe
-            df = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                low_memory=False,
-                usecols=["tconst", "genres"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )
+            df = cls._read_source(file_name, ["tconst", "genres"])
 
         except (FileNotFoundError, Exception) as e:
             error_message = f"File {file_name} not found: {e}"
             raise cls.FileProcessingError(error_message) from None
 
-        try:
-
-            df = (
-                df
-                .assign(
-                    genre=df["genres"].str.split(","),
+        with StageProfiler.stage(cls.__name__, "transform", df.shape[0]) as stage:
+            try:
+
+                df = cls._unnest(df, "genre", *cls._split_values(df["genres"]), key_column="tconst")
+                df = (
+                    df
+                    .assign(
+                        genre_id=cls._generate_interned_ids(df["genre"]),
+                    )
+                    .drop("genre", axis=1)
+                    .rename(columns={"tconst": "id"})
                 )
-                .explode("genre")
-                .drop("genres", axis=1)
-                .dropna(subset=["genre"])
-            )
-
-            df = (
-                df
-                .assign(
-                    genre_id=df["genre"].apply(lambda x: cls._generate_id(x) if x is not None else None),
-                )
-                .drop("genre", axis=1)
-                .rename(columns={"tconst": "id", "genre": "genre_id"})
-                .drop_duplicates(subset=["id", "genre_id"])
-            )
 
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
+            except Exception as e:
+                error_message = f"File {file_name} not found: {e}"
+                raise cls.DataTransformationError(error_message) from None
+            stage.rows_out = df.shape[0]
 
         cls._save_to_parquet(df)
         print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
@@ -1,31 +1,18 @@
-import pandas as pd
-from pathlib import Path
-
-from .abstract_table import AbstractTable
+from typing import ClassVar
 
+import pandas as pd
 
-class Types(AbstractTable):
-    @classmethod
-    def process_table(cls, file_name: str, second_file_name: str | None) -> None:
+from .dimension_table import DimensionTable
 
-        _ = second_file_name
 
-        print(f"Processing table: {cls.__name__}, file: {file_name}", flush=True)
+class Types(DimensionTable):
+    batch_columns: ClassVar[list[str]] = ["titleType"]
+    dimension_source: ClassVar[str] = "title.basics.tsv"
 
-        try:
-            # read title.basics.tsv - column titleType into Pandas series, filter unique values and create dataframe
-            s = pd.read_csv(
-                Path(cls.temp_directory, file_name),
-                sep="\t",
-                usecols=["titleType"],
-                nrows=cls.row_limit_size if cls.debug else None,
-            )["titleType"]
-            s = s.unique()  # type: ignore
-            df = pd.DataFrame({"titleType": s})
+    @classmethod
+    def _dimension_frame(cls, values: pd.Series) -> pd.DataFrame:
 
-        except (FileNotFoundError, Exception) as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.FileProcessingError(error_message) from None
+        df = pd.DataFrame({"titleType": values.astype(cls.string_dtype)})
 
         mapping = {
             "movie": "Movie",
@@ -41,23 +28,14 @@ class Types(AbstractTable):
             "videoGame": "Video Game",
         }
 
-        try:
-
-            df = (
-                df
-                .assign(
-                    id=df["titleType"].apply(lambda x: cls._generate_id(x) if x is not None else None),
-                )
-                .replace(mapping)
-                .rename(columns={"titleType": "type"})
-                .sort_values(by=["type"])
-                .reindex(columns=["id", "type"])
-                .reset_index(drop=True)
+        return (
+            df
+            .assign(
+                id=cls._generate_interned_ids(df["titleType"]),
             )
-
-        except Exception as e:
-            error_message = f"File {file_name} not found: {e}"
-            raise cls.DataTransformationError(error_message) from None
-
-        cls._save_to_parquet(df)
-        print(f"Finished table {cls.__name__}, file: {file_name}", flush=True)
+            .replace(mapping)
+            .rename(columns={"titleType": "type"})
+            .sort_values(by=["type"])
+            .reindex(columns=["id", "type"])
+            .reset_index(drop=True)
+        )
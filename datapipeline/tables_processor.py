@@ -1,9 +1,16 @@
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import TypeVar
+from typing import ClassVar, TypeVar
 
 from .abstract_table import AbstractTable
+from .delta_state import DeltaState
+from .output_cache import OutputCache
+from .source_cache import SourceCache
+from .source_reader import SourceReader
+from .stage_profiler import StageProfiler
+from .table_scheduler import TableScheduler
+from .title_index import TitleIndex
 from .table_titles import Titles
 from .table_types import Types
 from .table_episodes import Episodes
@@ -22,45 +29,185 @@ from .table_jobs import Jobs
 
 class TablesProcessor:
     T = TypeVar("T")
+    TableEntry = tuple[type[AbstractTable], str, str | None]
+    tables: ClassVar[list[TableEntry]] = [
+        (Titles, "title.basics.tsv", "title.ratings.tsv"),
+        (Types, "title.basics.tsv", None),
+        (Episodes, "title.episode.tsv", "title.basics.tsv"),
+        (Names, "title.basics.tsv", "title.akas.tsv"),
+        (TitlesGenres, "title.basics.tsv", None),
+        (Genres, "title.basics.tsv", None),
+        (Principals, "title.principals.tsv", "title.basics.tsv"),
+        (PrincipalsCharacters, "title.principals.tsv", "title.basics.tsv"),
+        (Characters, "title.principals.tsv", None),
+        (Persons, "name.basics.tsv", None),
+        (PersonsProfessions, "name.basics.tsv", None),
+        (Professions, "name.basics.tsv", None),
+        (Categories, "title.principals.tsv", None),
+        (Jobs, "title.principals.tsv", None),
+    ]
 
     class TablesProcessorError(Exception):
         pass
 
     @staticmethod
-    def _set_variables(temp_directory: Path, row_limit_size: int, batch_size: int, debug: bool) -> None:
+    def _set_variables(  # noqa: PLR0913
+            temp_directory: Path,
+            row_limit_size: int,
+            batch_size: int,
+            debug: bool,
+            batch_workers: int = 1,
+            sort_memory_limit: int = 0,
+            integer_ids: bool = False,
+            incremental: bool = False,
+            merge_deltas: bool = True,
+            partitioned_output: bool = False,
+            profile_directory: Path | None = None,
+    ) -> None:
 
         AbstractTable.temp_directory = temp_directory
         AbstractTable.row_limit_size = row_limit_size
         AbstractTable.batch_size = batch_size
         AbstractTable.debug = debug
+        AbstractTable.batch_workers = batch_workers
+        AbstractTable.sort_memory_limit = sort_memory_limit
+        AbstractTable.integer_ids = integer_ids
+        AbstractTable.incremental = incremental
+        AbstractTable.merge_deltas = merge_deltas
+        AbstractTable.partitioned_output = partitioned_output
+        SourceReader.integer_ids = integer_ids
+        StageProfiler.configure(profile_directory)
+
+    @staticmethod
+    def _register_sources(tables: list[TableEntry]) -> None:
+
+        # every source file is parsed once per run, with the union of the columns its tables declare
+        for table, _, _ in tables:
+            for file_name, columns in table.source_columns.items():
+                SourceCache.register(file_name, columns)
+
+    @classmethod
+    def _delta_sources(cls) -> dict[str, list[str]]:
+        sources: dict[str, set[str]] = {}
+        for table, file_name, _ in cls.tables:
+            for source, columns in table.source_columns.items():
+                sources.setdefault(source, set()).update(columns)
+            if table.batch_columns:
+                sources.setdefault(file_name, set()).update(table.batch_columns)
+        return {source: sorted(columns) for source, columns in sources.items()}
+
+    @staticmethod
+    def _release_sources(table: type[AbstractTable]) -> None:
+        for file_name in table.source_columns:
+            SourceCache.release(file_name)
+
+    @classmethod
+    def _process_sequentially(cls, tables: list[TableEntry]) -> None:
+        cls._register_sources(tables)
+        for table, file_name, second_file_name in tables:
+            table.process(file_name, second_file_name)
+            cls._release_sources(table)
+
+    @classmethod
+    def _process_in_parallel(cls, tables: list[TableEntry], max_workers: int, memory_budget: int) -> None:
+        jobs = TableScheduler.build_jobs(AbstractTable.temp_directory, tables)
+        initargs = (AbstractTable.temp_directory, AbstractTable.row_limit_size, AbstractTable.batch_size,
+                    AbstractTable.debug, AbstractTable.batch_workers, AbstractTable.sort_memory_limit,
+                    AbstractTable.integer_ids, AbstractTable.incremental, AbstractTable.merge_deltas,
+                    AbstractTable.partitioned_output, StageProfiler.directory)
+        TableScheduler.run(jobs, max_workers, memory_budget, cls._set_variables, initargs)
+
+    @classmethod
+    def _restore_cached(cls) -> tuple[list[TableEntry], dict[type[AbstractTable], str]]:
+
+        # tables restored from the output cache are not scheduled, nor are the sources only they read
+        keys = {table: OutputCache.key(table, file_name, second_file_name)
+                for table, file_name, second_file_name in cls.tables}
+        tables = [entry for entry in cls.tables if not OutputCache.restore(entry[0], keys[entry[0]])]
+        return tables, keys
+
+    @staticmethod
+    def _fuse_dimensions(tables: list[TableEntry]) -> list[TableEntry]:
+
+        # dimension tables are built by the fact table reading the same column, when that one is scheduled as well
+        fused = {dimension for table, _, _ in tables for dimension in table.dimensions}
+        return [entry for entry in tables if entry[0] not in fused]
+
+    @staticmethod
+    def _store_cached(tables: list[TableEntry], keys: dict[type[AbstractTable], str], output_cache_size: int) -> None:
+        for table, _, _ in tables:
+            # a base output that is still waiting for its delta is not the output of the current sources
+            if table.incremental and not table.merge_deltas and table.delta_key is not None:
+                continue
+            OutputCache.store(table, keys[table])
+        OutputCache.evict(AbstractTable.temp_directory, output_cache_size)
 
     @classmethod
-    def process_tables(cls, temp_directory: Path, row_limit_size: int, batch_size: int, debug: bool) -> None:
+    def process_tables(  # noqa: PLR0913
+            cls,
+            temp_directory: Path,
+            row_limit_size: int,
+            batch_size: int,
+            debug: bool,
+            max_workers: int = 1,
+            memory_budget: int = 0,
+            batch_workers: int = 1,
+            sort_memory_limit: int = 0,
+            integer_ids: bool = False,
+            incremental: bool = False,
+            merge_deltas: bool = True,
+            output_cache_size: int = 0,
+            partitioned_output: bool = False,
+            profile: bool = False,
+    ) -> None:
 
-        cls._set_variables(temp_directory, row_limit_size, batch_size, debug)
+        # every process of the run records its stages into the profiling directory
+        profile_directory = StageProfiler.start(temp_directory) if profile else None
+        cls._set_variables(temp_directory, row_limit_size, batch_size, debug, batch_workers, sort_memory_limit,
+                           integer_ids, incremental, merge_deltas, partitioned_output, profile_directory)
+        started = datetime.now()  # noqa: DTZ005
         start_time = time.time()
-        print(f"\n\033[92mStarting : {datetime.now().strftime('%H:%M:%S')}\033[0m")  # noqa: DTZ005
+        print(f"\n\033[92mStarting : {started.strftime('%H:%M:%S')}\033[0m")
 
         try:
 
-            Titles.process_table("title.basics.tsv", "title.ratings.tsv")
-            Types.process_table("title.basics.tsv", None)
-            Episodes.process_table("title.episode.tsv", "title.basics.tsv")
-            Names.process_table("title.basics.tsv", "title.akas.tsv")
-            TitlesGenres.process_table("title.basics.tsv", None)
-            Genres.process_table("title.basics.tsv", None)
-            Principals.process_table("title.principals.tsv", "title.basics.tsv")
-            PrincipalsCharacters.process_table("title.principals.tsv", "title.basics.tsv")
-            Characters.process_table("title.principals.tsv", None)
-            Persons.process_table("name.basics.tsv", None)
-            PersonsProfessions.process_table("name.basics.tsv", None)
-            Professions.process_table("name.basics.tsv", None)
-            Categories.process_table("title.principals.tsv", None)
-            Jobs.process_table("title.principals.tsv", None)
+            SourceCache.clear(temp_directory)
+            TitleIndex.clear(temp_directory)
+
+            # the sources are compared with the previous run, its snapshots are replaced once all tables succeeded
+            if incremental and not debug:
+                DeltaState.plan(temp_directory, cls._delta_sources())
+            else:
+                DeltaState.clear(temp_directory)
+
+            tables, keys = cls._restore_cached() if output_cache_size else (cls.tables, {})
+            if max_workers > 1:
+                cls._process_in_parallel(cls._fuse_dimensions(tables), max_workers, memory_budget)
+            else:
+                cls._process_sequentially(cls._fuse_dimensions(tables))
+
+            if output_cache_size:
+                cls._store_cached(tables, keys, output_cache_size)
+
+            if incremental and not debug:
+                DeltaState.commit(temp_directory)
+
+            end_time = time.time()
+            if profile:
+                report_path = StageProfiler.report(temp_directory, started, end_time - start_time)
+                print(f"Profiling report saved to {report_path}", flush=True)
+
+        except StageProfiler.StageProfilerError as e:
+            raise cls.TablesProcessorError(str(e)) from None
 
         except Exception as e:
             error_message = f"Error during tables processing: {e}"
             raise cls.TablesProcessorError(error_message) from None
 
-        end_time = time.time()
+        finally:
+            SourceCache.clear(temp_directory)
+            TitleIndex.clear(temp_directory)
+            # the stage records of a run that failed are not reported
+            StageProfiler.stop()
+
         print(f"\n\033[92mTotal time taken: {end_time - start_time} seconds\033[0m")
@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .source_cache import SourceCache
+from .source_reader import SourceReader
+
+
+class TitleIndex:
+    bitmaps: ClassVar[dict[str, np.ndarray]] = {}
+
+    class TitleIndexError(Exception):
+        pass
+
+    @staticmethod
+    def _index_path(temp_directory: Path, file_name: str) -> Path:
+        return Path(temp_directory, f"{file_name}.index.npy")
+
+    @staticmethod
+    def numbers(s: pd.Series) -> np.ndarray:
+
+        # tt0000001 -> 1, values that are not title ids become -1
+        if pd.api.types.is_integer_dtype(s.dtype):
+            return s.to_numpy(dtype=np.int64, na_value=-1)
+        array = pa.array(s, from_pandas=True)
+        is_title = pc.fill_null(pc.starts_with(array, "tt"), False)
+        digits = pc.utf8_slice_codeunits(array, 2)
+        try:
+            numbers = pc.cast(digits, pa.int64())
+        except pa.ArrowInvalid:
+            numbers = pa.array(pd.to_numeric(digits.to_pandas(), errors="coerce"), type=pa.int64(), from_pandas=True)
+        return pc.if_else(is_title, pc.fill_null(numbers, -1), -1).to_numpy(zero_copy_only=False)
+
+    @classmethod
+    def build(cls, temp_directory: Path, file_name: str) -> None:
+
+        # one bit per title number, built once per run and memory-mapped by every process that filters on it
+        index_path = cls._index_path(temp_directory, file_name)
+        if index_path.exists():
+            return
+
+        print(f"Building tconst index of {file_name}...", flush=True)
+        partial_path = index_path.with_suffix(".partial")
+        try:
+            # the source parsed for the tables is reused, only a source no table has parsed yet is read here
+            df = SourceCache.read_parsed(temp_directory, file_name, ["tconst"])
+            if df is None:
+                df = SourceReader.read(temp_directory, file_name, ["tconst"], None)
+            numbers = cls.numbers(df["tconst"])
+            del df
+            numbers = numbers[numbers >= 0]
+            bitmap = np.zeros(numbers.max() + 1 if numbers.size else 0, dtype=bool)
+            bitmap[numbers] = True
+            with partial_path.open("wb") as index_file:
+                np.save(index_file, np.packbits(bitmap, bitorder="little"))
+            partial_path.replace(index_path)
+
+        except Exception as e:
+            partial_path.unlink(missing_ok=True)
+            error_message = f"Error during building of tconst index of file: {file_name}, error: {e}"
+            raise cls.TitleIndexError(error_message) from None
+
+    @classmethod
+    def contains(cls, temp_directory: Path, file_name: str, s: pd.Series) -> np.ndarray:
+
+        if file_name not in cls.bitmaps:
+            cls.build(temp_directory, file_name)
+            cls.bitmaps[file_name] = np.load(cls._index_path(temp_directory, file_name), mmap_mode="r")
+        bitmap = cls.bitmaps[file_name]
+
+        numbers = cls.numbers(s)
+        valid = (numbers >= 0) & (numbers < 8 * bitmap.size)
+        result = np.zeros(numbers.size, dtype=bool)
+        numbers = numbers[valid]
+        result[valid] = (bitmap[numbers >> 3] >> (numbers & 7)) & 1
+        return result
+
+    @classmethod
+    def clear(cls, temp_directory: Path | None = None) -> None:
+        cls.bitmaps.clear()
+        if temp_directory is not None:
+            for index_path in Path(temp_directory).glob("*.tsv.index.npy"):
+                index_path.unlink()
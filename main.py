@@ -16,29 +16,52 @@ def main() -> None:
         f"{base_url}/title.akas.tsv.gz",
         f"{base_url}/title.principals.tsv.gz",
     ]
+    max_concurrent_downloads: int = 3
+    keep_downloaded_files: bool = True  # unchanged files are not downloaded again by the next run
+    extract_files: bool = False  # tables are read directly from the .tsv.gz archives
 
     """debugging"""
     debug: bool = True
     row_limit_size: int = 1_000_000
     batch_size: int = 100_000
+    max_workers: int = 1
+    memory_budget: int = 0
+    batch_workers: int = 1
+    sort_memory_limit: int = 0  # 0 sorts Titles and Names in memory
+    integer_ids: bool = False  # tconst/nconst as int32, ImdbIds.decode restores the tt0000001 form
+    incremental: bool = False  # keyed tables only process the titles and persons changed since the previous run
+    merge_deltas: bool = True  # False keeps <Table>.delta.parquet and <Table>.tombstones.parquet for the consumer
+    output_cache_size: int = 0  # 0 disables the output cache, tables with unchanged inputs reuse their Parquet files
+    partitioned_output: bool = False  # Titles and Principals as hive-partitioned datasets instead of single files
+    profile: bool = False  # time, rows, peak memory and I/O per table and stage in .data/profile/report-*.json and .csv
 
     """production"""
     # debug: bool = False
     # row_limit_size: int = 0
     # batch_size: int = 10_000_000
+    # max_workers: int = 8
+    # memory_budget: int = 24 * 1024 ** 3
+    # batch_workers: int = 4
+    # sort_memory_limit: int = 2 * 1024 ** 3
+    # incremental: bool = True
+    # output_cache_size: int = 8 * 1024 ** 3
 
     try:
 
         # download, extract and save files
-        FilesDownloader.download_extract_and_save_files(temp_directory, files_to_download)
+        FilesDownloader.download_extract_and_save_files(temp_directory, files_to_download, max_concurrent_downloads,
+                                                        extract_files)
         print("\nFiles downloaded and saved successfully.\n\n")
 
         # create parquet files from tables
-        TablesProcessor.process_tables(temp_directory, row_limit_size, batch_size, debug)
+        TablesProcessor.process_tables(temp_directory, row_limit_size, batch_size, debug, max_workers, memory_budget,
+                                       batch_workers, sort_memory_limit, integer_ids, incremental, merge_deltas,
+                                       output_cache_size, partitioned_output, profile)
         print("\nTables processed successfully.\n\n")
 
         # delete temporary files
-        FilesDownloader.delete_files(temp_directory, files_to_download)
+        if not keep_downloaded_files:
+            FilesDownloader.delete_files(temp_directory, files_to_download)
 
     except (FilesDownloader.DownloadError, TablesProcessor.TablesProcessorError) as e:
         print(f"Error(s) occurred: {e}")
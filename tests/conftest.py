@@ -0,0 +1,31 @@
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from datapipeline.abstract_table import AbstractTable
+from datapipeline.synthetic_sources import SyntheticSources
+
+
+@pytest.fixture()
+def sources(tmp_path: Path) -> Iterator[Path]:
+
+    # a small copy of the IMDb files, the class variables of the tables are left as every test found them
+    SyntheticSources.generate(tmp_path, 20_000)
+    variables = dict(vars(AbstractTable))
+    yield tmp_path
+    for name in ("temp_directory", "row_limit_size", "batch_size", "debug", "batch_workers", "sort_memory_limit",
+                 "integer_ids", "incremental", "merge_deltas", "partitioned_output"):
+        if name in variables:
+            setattr(AbstractTable, name, variables[name])
+
+
+@pytest.fixture()
+def read_outputs() -> Callable[[Path], dict[str, pd.DataFrame]]:
+
+    # the Parquet files a run wrote, by file name
+    def read(directory: Path) -> dict[str, pd.DataFrame]:
+        return {path.name: pd.read_parquet(path) for path in sorted(directory.glob("*.parquet"))}
+
+    return read
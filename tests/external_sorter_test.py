@@ -0,0 +1,70 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from datapipeline.external_sorter import ExternalSorter
+
+
+def _frames(rows: int, frame_rows: int) -> list[pd.DataFrame]:
+
+    # duplicated keys, missing sort values, and categoricals with a dictionary of their own in every frame
+    rng = np.random.default_rng(7)
+    keys = rng.integers(0, rows // 2, rows)
+    df = pd.DataFrame({
+        "id": pd.Series([f"tt{key:07d}" for key in keys], dtype=object),
+        "year": pd.Series(rng.integers(1900, 2025, rows), dtype="Int64").mask(rng.random(rows) < 0.1),
+        # one large dictionary shared by all frames, like the interned ids of Titles
+        "title": pd.Categorical([f"Title {value}" for value in rng.integers(0, rows, rows)]),
+    })
+    genres = np.array([f"Genre {value}" for value in range(200)])
+    return [frame.assign(genre=pd.Categorical(genres[rng.integers(0, 200, frame.shape[0])]))
+            for frame in (df.iloc[start:start + frame_rows].reset_index(drop=True)
+                          for start in range(0, rows, frame_rows))]
+
+
+def _in_memory(frames: list[pd.DataFrame], sort_column: str, key_columns: list[str]) -> pd.DataFrame:
+    return (
+        pd.concat(frames, ignore_index=True)
+        .sort_values(by=[sort_column], kind="stable")
+        .drop_duplicates(subset=key_columns)
+        .reset_index(drop=True)
+        .astype({"genre": object, "title": object})
+    )
+
+
+@pytest.mark.parametrize("memory_limit", [200_000, 500_000, 1_000_000, 2_000_000])
+def test_sort_matches_the_in_memory_sort(tmp_path: Path, memory_limit: int) -> None:
+    frames = _frames(100_000, 7_000)
+    assert sum(frame.memory_usage(deep=True).sum() for frame in frames) > 5 * memory_limit
+
+    result = pd.concat(ExternalSorter.sort(frames, Path(tmp_path, "sort"), "year", ["id"], memory_limit),
+                       ignore_index=True)
+
+    assert isinstance(result["genre"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["title"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(result.astype({"genre": object, "title": object}), _in_memory(frames, "year", ["id"]))
+    assert not Path(tmp_path, "sort").exists()
+
+
+def test_runs_are_merged_in_several_passes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ExternalSorter, "merge_fan_in", 4)
+    frames = _frames(20_000, 3_000)
+    merge = ExternalSorter._merge  # noqa: SLF001
+    fan_ins = []
+
+    def counted_merge(run_paths: list[Path], sort_column: str) -> Iterator[pa.Table]:
+        fan_ins.append(len(run_paths))
+        return merge(run_paths, sort_column)
+
+    monkeypatch.setattr(ExternalSorter, "_merge", counted_merge)
+    sorted_frames = ExternalSorter.sort(frames, Path(tmp_path, "sort"), "id", ["id", "year"], 100_000)
+    result = pd.concat(sorted_frames, ignore_index=True)
+
+    assert len(fan_ins) > 1
+    assert max(fan_ins) <= 4
+    expected = _in_memory(frames, "id", ["id", "year"])
+    pd.testing.assert_frame_equal(result.astype({"genre": object, "title": object}), expected)
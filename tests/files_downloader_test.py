@@ -0,0 +1,180 @@
+import gzip
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from datapipeline.files_downloader import FilesDownloader
+
+TSV = b"".join(f"tt{index:07d}\tmovie\tTitle {index}\t\\N\n".encode() for index in range(20_000))
+
+
+class _FileServer(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _FileHandler)
+        self.files: dict[str, bytes] = {}
+        self.etags: dict[str, str] = {}
+        self.truncate: set[str] = set()
+        self.requests: list[dict[str, str]] = []
+
+    def url(self, file_name: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{file_name}"
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    server: _FileServer
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        file_name = self.path.lstrip("/")
+        body, etag = self.server.files[file_name], self.server.etags[file_name]
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        status, start = 200, 0
+        if self.headers.get("Range") and self.headers.get("If-Range", etag) == etag:
+            status, start = 206, int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+
+        # the first response of a truncated file breaks off halfway
+        if file_name in self.server.truncate:
+            self.server.truncate.discard(file_name)
+            self.wfile.write(body[start:start + (len(body) - start) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+
+@pytest.fixture()
+def server() -> Iterator[_FileServer]:
+    file_server = _FileServer()
+    thread = threading.Thread(target=file_server.serve_forever, daemon=True)
+    thread.start()
+    manifest, extract_files, chunk_size = FilesDownloader.manifest, FilesDownloader.extract_files, \
+        FilesDownloader.chunk_size
+    FilesDownloader.chunk_size = 4 * 1024
+    yield file_server
+    FilesDownloader.manifest, FilesDownloader.extract_files, FilesDownloader.chunk_size = \
+        manifest, extract_files, chunk_size
+    file_server.shutdown()
+    file_server.server_close()
+
+
+def _serve(server: _FileServer, file_name: str, body: bytes, etag: str = '"v1"') -> str:
+    server.files[file_name], server.etags[file_name] = body, etag
+    return server.url(file_name)
+
+
+def test_the_extracted_file_matches_the_source(server: _FileServer, tmp_path: Path) -> None:
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV))
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV
+    assert not (tmp_path / "title.basics.tsv.gz").exists()
+    assert not (tmp_path / "title.basics.tsv.gz.partial").exists()
+
+
+def test_every_member_of_a_multi_member_archive_is_extracted(server: _FileServer, tmp_path: Path) -> None:
+    half = len(TSV) // 2
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV[:half]) + gzip.compress(TSV[half:]))
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV
+
+
+def test_a_compressed_file_is_kept_as_downloaded(server: _FileServer, tmp_path: Path) -> None:
+    body = gzip.compress(TSV)
+    url = _serve(server, "title.basics.tsv.gz", body)
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, False)
+
+    assert (tmp_path / "title.basics.tsv.gz").read_bytes() == body
+    assert not (tmp_path / "title.basics.tsv").exists()
+
+
+def test_a_truncated_transfer_is_resumed(server: _FileServer, tmp_path: Path) -> None:
+    body = gzip.compress(TSV)
+    url = _serve(server, "title.basics.tsv.gz", body)
+    server.truncate.add("title.basics.tsv.gz")
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV
+    # the bytes of the broken off response are not requested again
+    assert len(server.requests) == 2
+    assert 0 < int(server.requests[1]["Range"].removeprefix("bytes=").rstrip("-")) <= len(body) // 2
+
+
+def test_a_corrupt_partial_file_is_discarded(server: _FileServer, tmp_path: Path) -> None:
+    body = gzip.compress(TSV)
+    url = _serve(server, "title.basics.tsv.gz", body)
+    (tmp_path / "title.basics.tsv.gz.partial").write_bytes(b"\x1f\x8b" + bytes(len(body) // 2))
+    (tmp_path / "manifest.json").write_text('{"title.basics.tsv.gz": {"partial": {"etag": "\\"v1\\""}}}')
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV
+    assert "Range" in server.requests[0]
+    assert "Range" not in server.requests[-1]
+
+
+def test_a_resumed_transfer_asks_for_the_version_of_its_partial_file(server: _FileServer, tmp_path: Path) -> None:
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV))
+    server.truncate.add("title.basics.tsv.gz")
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert server.requests[1]["If-Range"] == '"v1"'
+    assert "partial" not in FilesDownloader.manifest["title.basics.tsv.gz"]
+
+
+def test_a_partial_file_of_another_version_is_replaced(server: _FileServer, tmp_path: Path) -> None:
+    body = gzip.compress(TSV)
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV[::-1]), '"v2"')
+    (tmp_path / "title.basics.tsv.gz.partial").write_bytes(body[:len(body) // 2])
+    (tmp_path / "manifest.json").write_text('{"title.basics.tsv.gz": {"partial": {"etag": "\\"v1\\""}}}')
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV[::-1]
+    assert [request["If-Range"] for request in server.requests] == ['"v1"']
+
+
+def test_an_unchanged_file_is_not_downloaded_again(server: _FileServer, tmp_path: Path) -> None:
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV))
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+    modified = (tmp_path / "title.basics.tsv").stat().st_mtime_ns
+
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    assert (tmp_path / "title.basics.tsv").stat().st_mtime_ns == modified
+    assert (tmp_path / "title.basics.tsv").read_bytes() == TSV
+
+
+def test_a_version_with_other_content_than_recorded_is_rejected(server: _FileServer, tmp_path: Path) -> None:
+    url = _serve(server, "title.basics.tsv.gz", gzip.compress(TSV))
+    assert FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+    manifest = (tmp_path / "manifest.json").read_text()
+    (tmp_path / "manifest.json").write_text(manifest.replace("sha256:", "sha256:0"))
+    (tmp_path / "title.basics.tsv").unlink()
+
+    with pytest.raises(FilesDownloader.DownloadError):
+        FilesDownloader.download_extract_and_save_files(tmp_path, [url], 1, True)
+
+    assert not (tmp_path / "title.basics.tsv").exists()
+    assert not (tmp_path / "title.basics.tsv.gz.partial").exists()
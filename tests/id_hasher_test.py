@@ -0,0 +1,66 @@
+import hashlib
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from datapipeline.abstract_table import AbstractTable
+from datapipeline.id_hasher import IdHasher
+from datapipeline.imdb_ids import ImdbIds
+
+
+# the per-row helpers the ids were generated with before IdHasher, kept as the oracle
+def _legacy_id(column: str | float | None) -> str | float | None:
+    if pd.isna(column):
+        return column
+    return hashlib.md5(str(column).encode("utf-8")).hexdigest()
+
+
+def _legacy_synthetic_id(row: dict[str, Any]) -> str:
+    combined_values = row["tconst"] + str(row["ordering"]) + row["nconst"]
+    return hashlib.md5(combined_values.encode("utf-8")).hexdigest()
+
+
+@pytest.mark.parametrize("dtype", [object, pd.StringDtype("pyarrow"), "category"])
+def test_hash_values_matches_the_per_row_hash(dtype: type | str | pd.StringDtype) -> None:
+    s = pd.Series(["tt0000001", None, "\\N", "nm0000002", "tt0000001", "Ärger", np.nan, ""], dtype=dtype)
+
+    result = pd.Series(IdHasher.hash_values(s), dtype=object)
+
+    expected = s.astype(object).map(_legacy_id)
+    assert result.dtype == object
+    assert result.isna().tolist() == expected.isna().tolist()
+    assert result.dropna().tolist() == expected.dropna().tolist()
+
+
+def test_hash_columns_matches_the_per_row_synthetic_hash() -> None:
+    df = pd.DataFrame({
+        "tconst": pd.Series(["tt0000001", "tt0000001", "tt0000002", "tt0000012"], dtype=pd.StringDtype("pyarrow")),
+        "ordering": pd.Series([1, 2, 10, 1], dtype="Int64"),
+        "nconst": pd.Series(["nm0000001", "nm0000002", "nm0000001", "nm0000003"], dtype=object),
+    })
+
+    result = pd.Series(IdHasher.hash_columns(df, ["tconst", "ordering", "nconst"]), dtype=object)
+
+    expected = df.astype({"tconst": object}).apply(_legacy_synthetic_id, axis=1)
+    assert result.tolist() == expected.tolist()
+    # the key is joined in column order
+    assert IdHasher.hash_columns(df, ["nconst", "ordering", "tconst"]).tolist() != result.tolist()
+
+
+def test_synthetic_ids_of_integer_ids_hash_their_string_form() -> None:
+    df = pd.DataFrame({
+        "tconst": ["tt0000001", "tt0000002", "tt1234567"],
+        "ordering": pd.Series([1, 2, 3], dtype="Int64"),
+        "nconst": ["nm0000001", "nm0000002", "nm7654321"],
+    })
+    encoded = df.assign(
+        tconst=pd.Series(ImdbIds.encode(pa.array(df["tconst"]), "tt"), dtype="Int32"),
+        nconst=pd.Series(ImdbIds.encode(pa.array(df["nconst"]), "nm"), dtype="Int32"),
+    )
+
+    result = AbstractTable._generate_synthetic_ids(encoded)  # noqa: SLF001
+
+    assert result.tolist() == df.apply(_legacy_synthetic_id, axis=1).tolist()
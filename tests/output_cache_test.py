@@ -0,0 +1,46 @@
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from datapipeline.tables_processor import TablesProcessor
+
+
+def _change_ratings(path: Path) -> None:
+    header, *lines = path.read_text().splitlines()
+    rows = [line.rsplit("\t", 1)[0] + "\t7" if index % 41 == 2 else line for index, line in enumerate(lines)]
+    path.write_text("\n".join([header, *rows]) + "\n")
+
+
+def test_a_changed_source_invalidates_the_cached_outputs_of_its_tables(
+        sources: Path, tmp_path_factory: pytest.TempPathFactory, capsys: pytest.CaptureFixture[str],
+        read_outputs: Callable[[Path], dict[str, pd.DataFrame]]) -> None:
+    TablesProcessor.process_tables(sources, 0, 2_000, False, output_cache_size=10**9)
+    expected = read_outputs(sources)
+    capsys.readouterr()
+
+    # an unchanged run restores every table
+    TablesProcessor.process_tables(sources, 0, 2_000, False, output_cache_size=10**9)
+    assert "Processing table" not in capsys.readouterr().out
+    outputs = read_outputs(sources)
+    for name, df in outputs.items():
+        pd.testing.assert_frame_equal(df, expected[name], obj=name)
+
+    _change_ratings(sources / "title.ratings.tsv")
+    rebuilt = tmp_path_factory.mktemp("rebuilt")
+    for path in sources.glob("*.tsv"):
+        shutil.copy(path, rebuilt)
+    TablesProcessor.process_tables(rebuilt, 0, 2_000, False)
+    expected = read_outputs(rebuilt)
+
+    # only Titles reads the ratings
+    TablesProcessor.process_tables(sources, 0, 2_000, False, output_cache_size=10**9)
+    out = capsys.readouterr().out
+    assert "Processing table: Titles" in out
+    assert "Table Persons restored from output cache" in out
+    outputs = read_outputs(sources)
+    assert list(outputs) == list(expected)
+    for name, df in outputs.items():
+        pd.testing.assert_frame_equal(df, expected[name], obj=name)
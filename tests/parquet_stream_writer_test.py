@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from datapipeline.parquet_profile import ParquetProfile
+from datapipeline.parquet_stream_writer import ParquetStreamWriter
+
+
+def test_parts_of_earlier_runs_are_removed(tmp_path: Path) -> None:
+    table = pa.Table.from_pandas(pd.DataFrame({"id": [1, 2, 3]}), preserve_index=False)
+    for part in range(3):
+        pd.DataFrame({"id": [part]}).to_parquet(tmp_path / f"Titles_{part:02}.parquet")
+    other_path = tmp_path / "Titles_archive.parquet"
+    pd.DataFrame({"id": [0]}).to_parquet(other_path)
+
+    with ParquetStreamWriter(tmp_path / "Titles.parquet", ParquetProfile()) as writer:
+        writer.write(table)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["Titles.parquet", other_path.name]
+
+
+@pytest.mark.parametrize("years", [[1990, 2000, 1990, None], [1990, 2000, 1990, 2001]])
+def test_partitioned_output_is_read_by_plain_readers(tmp_path: Path, years: list[int | None]) -> None:
+    df = pd.DataFrame({
+        "tconst": [1, 2, 3, 4],
+        "start_year": pd.array(years, dtype="Int64"),
+        "genre_id": pd.Categorical(["a", "b", None, "a"]),
+    })
+    dataset_path = tmp_path / "Titles.parquet"
+    profile = ParquetProfile(partition_columns=("start_year",))
+
+    ParquetStreamWriter.write_partitioned(dataset_path, [pa.Table.from_pandas(df, preserve_index=False)], profile)
+
+    result = pd.read_parquet(dataset_path).sort_values("tconst", ignore_index=True)
+    result = result.astype({"start_year": "Int64"})[df.columns]
+    pd.testing.assert_frame_equal(result, df)
+    own = ParquetStreamWriter.read(dataset_path, profile.partition_columns).to_pandas()
+    pd.testing.assert_frame_equal(own.sort_values("tconst", ignore_index=True), df)
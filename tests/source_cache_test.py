@@ -0,0 +1,40 @@
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from datapipeline.source_cache import SourceCache
+from datapipeline.source_reader import SourceReader
+from datapipeline.tables_processor import TablesProcessor
+
+
+@pytest.fixture(autouse=True)
+def _clear_source_cache() -> Iterator[None]:
+    yield
+    SourceCache.clear()
+
+
+def test_a_debug_spill_serves_only_the_debug_rows(sources: Path) -> None:
+    SourceCache.spill(sources, "title.basics.tsv", ["tconst", "genres"], 1_000)
+
+    spilled = SourceCache.read(sources, "title.basics.tsv", ["tconst", "genres"], 1_000)
+
+    assert "title.basics.tsv" not in SourceCache.frames
+    pd.testing.assert_frame_equal(spilled, SourceReader.read(sources, "title.basics.tsv", ["tconst", "genres"], 1_000))
+    # the tconst index and the unlimited reads need every row of the source
+    assert SourceCache.read_parsed(sources, "title.basics.tsv", ["tconst"]) is None
+    assert SourceCache.read(sources, "title.basics.tsv", ["tconst"], None).shape[0] > 1_000
+
+
+def test_tables_reading_spilled_sources_match_the_sequential_run(
+        sources: Path, read_outputs: Callable[[Path], dict[str, pd.DataFrame]]) -> None:
+    TablesProcessor.process_tables(sources, 0, 2_000, False)
+    expected = read_outputs(sources)
+
+    TablesProcessor.process_tables(sources, 0, 2_000, False, max_workers=3)
+
+    outputs = read_outputs(sources)
+    assert list(outputs) == list(expected)
+    for name, df in outputs.items():
+        pd.testing.assert_frame_equal(df, expected[name], obj=name)
@@ -0,0 +1,42 @@
+import json
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from datapipeline.stage_profiler import StageProfiler
+from datapipeline.tables_processor import TablesProcessor
+
+
+def test_nested_stages_are_not_counted_twice(tmp_path: Path) -> None:
+    def frames() -> Iterator[list[int]]:
+        for _ in range(2):
+            with StageProfiler.stage("Table", "read"):
+                time.sleep(0.05)
+            yield [1, 2]
+
+    StageProfiler.start(tmp_path)
+    start_time = time.perf_counter()
+    with StageProfiler.stage("Table", "save"):
+        for _ in StageProfiler.iterate("Table", "sort", frames()):
+            time.sleep(0.02)
+    wall_time = time.perf_counter() - start_time
+    report_path = StageProfiler.report(tmp_path, datetime.now(), wall_time)  # noqa: DTZ005
+
+    stages = {stage["stage"]: stage for stage in json.loads(report_path.read_text())["stages"]}
+    assert stages["read"]["wall_time"] >= 0.1
+    assert stages["sort"]["wall_time"] < 0.05
+    assert stages["save"]["wall_time"] >= 0.04
+    assert sum(stage["wall_time"] for stage in stages.values()) <= wall_time
+
+
+def test_a_failed_run_leaves_no_stage_records_behind(sources: Path) -> None:
+    (sources / "title.ratings.tsv").unlink()
+
+    with pytest.raises(TablesProcessor.TablesProcessorError):
+        TablesProcessor.process_tables(sources, 1_000, 1_000, False, profile=True)
+
+    assert not (sources / StageProfiler.directory_name / "stages").exists()
+    assert StageProfiler.directory is None
@@ -0,0 +1,82 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from datapipeline.abstract_table import AbstractTable
+from datapipeline.table_scheduler import TableJob, TableScheduler
+from datapipeline.tables_processor import TablesProcessor
+
+
+def _initialize() -> None:
+    pass
+
+
+def _record(directory: Path, name: str) -> None:
+
+    # the start and end of a job on the clock every process shares
+    start = time.monotonic()
+    time.sleep(0.2)
+    Path(directory, name).write_text(f"{start} {time.monotonic()}")
+
+
+def _intervals(directory: Path) -> dict[str, tuple[float, float]]:
+    intervals = {}
+    for path in directory.iterdir():
+        start, end = path.read_text().split()
+        intervals[path.name] = (float(start), float(end))
+    return intervals
+
+
+def test_every_job_has_a_memory_estimate(sources: Path) -> None:
+    AbstractTable.batch_size = 1_000
+    AbstractTable.batch_workers = 2
+
+    jobs = TableScheduler.build_jobs(sources, TablesProcessor.tables)
+
+    assert [job.name for job in jobs if job.memory <= 0] == []
+
+
+def test_batched_tables_are_bounded_by_their_batches(sources: Path) -> None:
+    AbstractTable.batch_size = 1_000
+    AbstractTable.batch_workers = 1
+    small = {job.name: job.memory for job in TableScheduler.build_jobs(sources, TablesProcessor.tables)}
+    AbstractTable.batch_size = 10_000_000
+    large = {job.name: job.memory for job in TableScheduler.build_jobs(sources, TablesProcessor.tables)}
+
+    assert 0 < small["Principals"] < large["Principals"]
+    assert large["Principals"] == TableScheduler.memory_factor * (sources / "title.principals.tsv").stat().st_size
+
+
+def test_running_jobs_stay_within_the_memory_budget(tmp_path: Path) -> None:
+    memory = {"a": 60, "b": 60, "c": 30, "d": 40}
+    jobs = [TableJob(name, _record, (tmp_path, name), job_memory) for name, job_memory in memory.items()]
+
+    TableScheduler.run(jobs, 4, 100, _initialize, ())
+
+    intervals = _intervals(tmp_path)
+    assert set(intervals) == set(memory)
+    for name, (start, _) in intervals.items():
+        running = [other for other, (other_start, other_end) in intervals.items() if other_start <= start < other_end]
+        assert sum(memory[other] for other in running) <= 100, name
+
+
+def test_a_job_starts_after_its_dependencies(tmp_path: Path) -> None:
+    jobs = [
+        TableJob("c", _record, (tmp_path, "c"), 1, {"a", "b"}),
+        TableJob("a", _record, (tmp_path, "a"), 1),
+        TableJob("b", _record, (tmp_path, "b"), 1, {"a"}),
+    ]
+
+    TableScheduler.run(jobs, 3, 0, _initialize, ())
+
+    intervals = _intervals(tmp_path)
+    assert intervals["b"][0] >= intervals["a"][1]
+    assert intervals["c"][0] >= max(intervals["a"][1], intervals["b"][1])
+
+
+def test_a_job_with_a_missing_dependency_is_an_error(tmp_path: Path) -> None:
+    jobs = [TableJob("a", _record, (tmp_path, "a"), 1, {"missing"})]
+
+    with pytest.raises(TableScheduler.TableSchedulerError):
+        TableScheduler.run(jobs, 2, 0, _initialize, ())
@@ -0,0 +1,46 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from datapipeline.imdb_ids import ImdbIds
+from datapipeline.source_reader import SourceReader
+from datapipeline.title_index import TitleIndex
+
+
+@pytest.fixture(autouse=True)
+def _clear_title_index() -> Iterator[None]:
+    yield
+    TitleIndex.clear()
+
+
+def _titles(sources: Path) -> pd.Series:
+    return SourceReader.read(sources, "title.basics.tsv", ["tconst"], None)["tconst"].astype(object)
+
+
+@pytest.mark.parametrize("dtype", [object, pd.StringDtype("pyarrow")])
+def test_contains_matches_a_join_with_the_titles(sources: Path, dtype: type | pd.StringDtype) -> None:
+    titles = _titles(sources)
+    episodes = SourceReader.read(sources, "title.episode.tsv", ["parentTconst"], None)["parentTconst"]
+    numbers = [f"tt{number:07d}" for number in range(0, 4 * len(titles), 5)]
+    s = pd.Series([*episodes.astype(object), *titles[::7], *numbers, None, "\\N", "nm0000001", "tt", "ttx0001",
+                   "tt9999999", "tt99999999999"], dtype=dtype)
+
+    result = TitleIndex.contains(sources, "title.basics.tsv", s)
+
+    assert result.dtype == bool
+    np.testing.assert_array_equal(result, s.isin(set(titles)).to_numpy())
+
+
+def test_contains_matches_a_join_with_the_titles_for_integer_ids(sources: Path) -> None:
+    titles = _titles(sources)
+    numbers = [*range(0, 4 * len(titles), 3), 9_999_999]
+    ids = pd.Series([f"tt{number:07d}" for number in numbers])
+    s = pd.Series(ImdbIds.encode(pa.array(ids), "tt"), dtype="Int32")
+
+    result = TitleIndex.contains(sources, "title.basics.tsv", s)
+
+    np.testing.assert_array_equal(result, ids.isin(set(titles)).to_numpy())